@@ -4,6 +4,7 @@ from sqlalchemy import select
 from app.models.UsuarioModel import UsuarioModel
 from .authUtils import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from fastapi import HTTPException, status
+from app.core.ejecutores import ejecutar_en_hilo
 
 async def authenticate_user(username: str, password: str, db: AsyncSession) -> UsuarioModel:
     """Autentica un usuario por correo/username y contraseña."""
@@ -18,7 +19,8 @@ async def authenticate_user(username: str, password: str, db: AsyncSession) -> U
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(password, user.contraseña):
+    # bcrypt es costoso a propósito; se verifica fuera del event loop
+    if not await ejecutar_en_hilo(verify_password, password, user.contraseña):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Correo o contraseña incorrectos",
@@ -17,8 +17,9 @@ DB_DATABASE = os.getenv("DB_DATABASE")
 
 DATABASE_URI = f"{PROTOCOLE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
 print(DATABASE_URI)
-# Configuración de la base de datos
-DATABASE_URL = DATABASE_URI
+# Configuración de la base de datos (DATABASE_URL permite, por ejemplo,
+# usar sqlite+aiosqlite:///./hare.db en desarrollo local)
+DATABASE_URL = os.getenv("DATABASE_URL", DATABASE_URI)
 
 # Crear el motor de la base de datos
 engine = create_async_engine(
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import time
+
+# Cachés del proceso (ver metricas_caches); cada worker de uvicorn tiene las suyas
+_caches = []
+
+class CacheLRU:
+    """Caché acotada con expulsión LRU, TTL opcional y contadores.
+
+    Con `ttl` None (o 0) las entradas solo salen por LRU o al invalidarlas.
+    Es segura entre hilos para poder usarse también desde los ejecutores.
+    """
+
+    def __init__(self, nombre: str, tamano_max: int, ttl: Optional[float] = None):
+        self.nombre = nombre
+        self.tamano_max = tamano_max
+        self.ttl = ttl or None
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiradas = 0
+        _caches.append(self)
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if expira is None or expira > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._entradas[clave]
+                self.expiradas += 1
+            self.fallos += 1
+            return defecto
+
+    def guardar(self, clave, valor):
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entradas[clave] = (valor, expira)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano_max:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def invalidar(self, predicado=None):
+        """Elimina las entradas cuya clave cumple `predicado` (todas si es None)."""
+        with self._lock:
+            if predicado is None:
+                self._entradas.clear()
+                return
+            for clave in [clave for clave in self._entradas if predicado(clave)]:
+                del self._entradas[clave]
+
+    def metricas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "tamano_max": self.tamano_max,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            "expulsiones": self.expulsiones,
+            "expiradas": self.expiradas,
+        }
+
+def metricas_caches() -> dict:
+    return {cache.nombre: cache.metricas() for cache in _caches}
+
+class CacheDisco:
+    """Caché de bytes en un directorio, acotada en número de archivos con
+    expulsión LRU (por último acceso). Las claves deben ser válidas como nombre
+    de archivo (por ejemplo, un hash hexadecimal).
+
+    Varios procesos pueden usar el mismo directorio: cada uno lee los archivos
+    que escribieron los demás, pero lleva su propio índice y expulsa según él,
+    así que `max_archivos` es un límite por proceso, no del directorio.
+
+    Sus métodos hacen E/S bloqueante: desde código asíncrono se llaman en el
+    pool de hilos.
+    """
+
+    def __init__(self, nombre: str, directorio: str, max_archivos: int):
+        self.nombre = nombre
+        self.directorio = directorio
+        self.max_archivos = max_archivos
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.expulsiones = 0
+        os.makedirs(directorio, exist_ok=True)
+        # Índice en memoria de los archivos conocidos, del menos al más reciente
+        archivos = [
+            entrada for entrada in os.scandir(directorio)
+            if entrada.is_file() and not entrada.name.startswith(".")
+        ]
+        archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+        self._archivos = OrderedDict((entrada.name, None) for entrada in archivos)
+        _caches.append(self)
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave)
+
+    def _registrar(self, clave: str) -> list:
+        """Marca la clave como la más reciente y devuelve las claves expulsadas.
+        Se llama con el lock tomado."""
+        self._archivos[clave] = None
+        self._archivos.move_to_end(clave)
+        expulsadas = []
+        while len(self._archivos) > self.max_archivos:
+            expulsadas.append(self._archivos.popitem(last=False)[0])
+            self.expulsiones += 1
+        return expulsadas
+
+    def _eliminar(self, claves: list):
+        for clave in claves:
+            try:
+                os.remove(self._ruta(clave))
+            except FileNotFoundError:
+                pass
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        # Se busca el archivo aunque no esté en el índice: puede haberlo
+        # escrito otro proceso
+        try:
+            with open(self._ruta(clave), "rb") as archivo:
+                datos = archivo.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._archivos.pop(clave, None)
+                self.fallos += 1
+            return None
+        with self._lock:
+            self.aciertos += 1
+            expulsadas = self._registrar(clave)
+        self._eliminar(expulsadas)
+        return datos
+
+    def guardar(self, clave: str, datos: bytes):
+        # Escritura atómica: los lectores nunca ven un archivo a medias. El
+        # temporal lleva proceso e hilo para no chocar con otros escritores
+        temporal = self._ruta(f".{clave}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporal, "wb") as archivo:
+            archivo.write(datos)
+        os.replace(temporal, self._ruta(clave))
+        with self._lock:
+            self.escrituras += 1
+            expulsadas = self._registrar(clave)
+        self._eliminar(expulsadas)
+
+    def metricas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "archivos": len(self._archivos),
+            "max_archivos": self.max_archivos,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            "escrituras": self.escrituras,
+            "expulsiones": self.expulsiones,
+        }
@@ -0,0 +1,41 @@
+import os
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Importación de estudiantes: filas por sentencia INSERT ... ON CONFLICT
+IMPORTACION_TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", "500"))
+# Importación en modo streaming: filas por bloque validado y confirmado
+IMPORTACION_TAMANO_BLOQUE = int(os.getenv("IMPORTACION_TAMANO_BLOQUE", "5000"))
+# Máximo de mensajes de error de filas conservados en el reporte de importación
+IMPORTACION_MAX_ERRORES = int(os.getenv("IMPORTACION_MAX_ERRORES", "100"))
+# Incluir en el reporte de importación cuánto creció la memoria residente
+IMPORTACION_MEDIR_MEMORIA = os.getenv("IMPORTACION_MEDIR_MEMORIA", "false").lower() in ("1", "true")
+
+# Trabajos de importación en segundo plano
+IMPORTACION_TRABAJOS_CONCURRENTES = int(os.getenv("IMPORTACION_TRABAJOS_CONCURRENTES", "2"))
+IMPORTACION_TRABAJOS_RETENIDOS = int(os.getenv("IMPORTACION_TRABAJOS_RETENIDOS", "100"))
+
+# Ejecutores para trabajo bloqueante fuera del event loop
+EJECUTOR_HILOS = int(os.getenv("EJECUTOR_HILOS", "4"))
+EJECUTOR_PROCESOS = int(os.getenv("EJECUTOR_PROCESOS", "2"))
+EJECUTOR_COLA_MAX = int(os.getenv("EJECUTOR_COLA_MAX", "32"))
+
+# Umbrales de nivel de riesgo: promedio máximo (inclusive) de ALTO y de MEDIO;
+# por encima es BAJO. Al cambiarlos, el nivel guardado se recalcula al iniciar
+RIESGO_ALTO_MAX = float(os.getenv("RIESGO_ALTO_MAX", "1.0"))
+RIESGO_MEDIO_MAX = float(os.getenv("RIESGO_MEDIO_MAX", "2.9"))
+
+# Caché de estadísticas por usuario (entradas y segundos de vida; 0 = sin TTL)
+CACHE_ESTADISTICAS_TAMANO = int(os.getenv("CACHE_ESTADISTICAS_TAMANO", "1024"))
+CACHE_ESTADISTICAS_TTL = float(os.getenv("CACHE_ESTADISTICAS_TTL", "300"))
+
+# Caché de diagramas renderizados: entradas en memoria y, si se indica un
+# directorio, copia en disco acotada en archivos (vacío = solo memoria)
+CACHE_GRAFICOS_TAMANO = int(os.getenv("CACHE_GRAFICOS_TAMANO", "256"))
+CACHE_GRAFICOS_DIRECTORIO = os.getenv("CACHE_GRAFICOS_DIRECTORIO", "")
+CACHE_GRAFICOS_DISCO_MAX = int(os.getenv("CACHE_GRAFICOS_DISCO_MAX", "4096"))
+# Cache-Control de los diagramas binarios. Se envían con ETag y
+# Vary: Authorization, así que detrás de un proxy puede usarse "public, ..."
+CACHE_GRAFICOS_CONTROL = os.getenv("CACHE_GRAFICOS_CONTROL", "private, max-age=60")
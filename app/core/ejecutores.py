@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from app.core.config import EJECUTOR_HILOS, EJECUTOR_PROCESOS, EJECUTOR_COLA_MAX
+import asyncio
+import functools
+import multiprocessing
+import time
+
+class EjecutorSaturado(Exception):
+    """La cola del ejecutor está llena; la petición debe reintentarse."""
+
+def _cronometrar(func, *args, **kwargs):
+    # Corre dentro del hilo/proceso trabajador: mide solo el tiempo de ejecución
+    inicio = time.perf_counter()
+    resultado = func(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+class Ejecutor:
+    """Pool de trabajadores con cola acotada y métricas.
+
+    Admite a lo sumo `trabajadores + cola_max` tareas pendientes; si está
+    lleno, `ejecutar` lanza EjecutorSaturado de inmediato, salvo con
+    `esperar=True` (trabajos en segundo plano), que espera un cupo.
+    """
+
+    def __init__(self, nombre: str, crear_pool, trabajadores: int, cola_max: int):
+        self.nombre = nombre
+        self.trabajadores = trabajadores
+        self.cola_max = cola_max
+        self._crear_pool = crear_pool
+        self._pool = None
+        self._cupos = None
+        self.pendientes = 0
+        self.completadas = 0
+        self.fallidas = 0
+        self.rechazadas = 0
+        self.tiempo_ejecucion_total = 0.0
+        self.tiempo_ejecucion_max = 0.0
+        self.tiempo_total = 0.0
+
+    def _obtener_cupos(self) -> asyncio.Semaphore:
+        if self._cupos is None:
+            self._cupos = asyncio.Semaphore(self.trabajadores + self.cola_max)
+        return self._cupos
+
+    def _obtener_pool(self):
+        # Los pools se crean en el primer uso para no lanzar procesos al importar
+        if self._pool is None:
+            self._pool = self._crear_pool(self.trabajadores)
+        return self._pool
+
+    async def ejecutar(self, func, *args, esperar: bool = False, **kwargs):
+        cupos = self._obtener_cupos()
+        if cupos.locked() and not esperar:
+            self.rechazadas += 1
+            raise EjecutorSaturado(f"El ejecutor '{self.nombre}' está saturado, intente más tarde")
+
+        async with cupos:
+            self.pendientes += 1
+            inicio = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                resultado, duracion = await loop.run_in_executor(
+                    self._obtener_pool(),
+                    functools.partial(_cronometrar, func, *args, **kwargs)
+                )
+            except BaseException:
+                self.fallidas += 1
+                raise
+            finally:
+                self.pendientes -= 1
+                self.tiempo_total += time.perf_counter() - inicio
+
+        self.completadas += 1
+        self.tiempo_ejecucion_total += duracion
+        self.tiempo_ejecucion_max = max(self.tiempo_ejecucion_max, duracion)
+        return resultado
+
+    def metricas(self) -> dict:
+        finalizadas = self.completadas + self.fallidas
+        return {
+            "trabajadores": self.trabajadores,
+            "cola_max": self.cola_max,
+            "pendientes": self.pendientes,
+            # Tareas esperando trabajador libre (las demás se están ejecutando)
+            "en_cola": max(0, self.pendientes - self.trabajadores),
+            "completadas": self.completadas,
+            "fallidas": self.fallidas,
+            "rechazadas": self.rechazadas,
+            "tiempo_ejecucion_promedio_ms": round(self.tiempo_ejecucion_total / self.completadas * 1000, 2) if self.completadas else 0.0,
+            "tiempo_ejecucion_max_ms": round(self.tiempo_ejecucion_max * 1000, 2),
+            "tiempo_total_promedio_ms": round(self.tiempo_total / finalizadas * 1000, 2) if finalizadas else 0.0,
+        }
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Hilos: trabajo que libera el GIL (bcrypt, lectura de archivos)
+hilos = Ejecutor(
+    "hilos",
+    lambda trabajadores: ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="ejecutor"),
+    EJECUTOR_HILOS,
+    EJECUTOR_COLA_MAX
+)
+
+# Procesos: trabajo de CPU en Python puro (pandas, matplotlib). Se usa "spawn"
+# para no duplicar con fork el event loop ni los hilos del proceso principal
+procesos = Ejecutor(
+    "procesos",
+    lambda trabajadores: ProcessPoolExecutor(
+        max_workers=trabajadores,
+        mp_context=multiprocessing.get_context("spawn")
+    ),
+    EJECUTOR_PROCESOS,
+    EJECUTOR_COLA_MAX
+)
+
+async def ejecutar_en_hilo(func, *args, esperar: bool = False, **kwargs):
+    return await hilos.ejecutar(func, *args, esperar=esperar, **kwargs)
+
+async def ejecutar_en_proceso(func, *args, esperar: bool = False, **kwargs):
+    """Ejecuta `func` en el pool de procesos; `func` y sus argumentos deben poder serializarse."""
+    return await procesos.ejecutar(func, *args, esperar=esperar, **kwargs)
+
+def metricas_ejecutores() -> dict:
+    return {
+        hilos.nombre: hilos.metricas(),
+        procesos.nombre: procesos.metricas(),
+    }
+
+def cerrar_ejecutores():
+    hilos.cerrar()
+    procesos.cerrar()
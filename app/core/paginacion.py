@@ -0,0 +1,69 @@
+from typing import List, Optional, Tuple
+import base64
+import binascii
+import json
+
+from sqlalchemy import tuple_
+
+# Encabezado con el cursor de la página siguiente en los listados paginados
+ENCABEZADO_CURSOR = "X-Next-Cursor"
+
+def codificar_cursor(valores: list) -> str:
+    """Cursor opaco con los valores de la clave de orden de la última fila."""
+    datos = json.dumps(valores, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, cantidad: int) -> list:
+    """Valores de la clave de orden del cursor; ValueError si no es válido."""
+    try:
+        datos = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(datos)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ValueError("Cursor inválido")
+    # Solo valores escalares: cualquier otra cosa fallaría en el driver
+    if not all(
+        isinstance(valor, (int, float, str)) and not isinstance(valor, bool)
+        for valor in valores
+    ):
+        raise ValueError("Cursor inválido")
+    return valores
+
+# Tamaño máximo de página de los listados paginados
+LIMITE_MAXIMO_PAGINA = 1000
+
+def aplicar_cursor(
+    query, columnas: list, cursor: Optional[str], limit: int,
+    skip: int = 0, descendente: bool = False
+):
+    """Ordena por `columnas` (clave única, todas en la misma dirección) y
+    continúa después del cursor con una comparación de tupla que puede
+    resolver un índice, sin recorrer las filas de las páginas anteriores.
+
+    `skip` (OFFSET) solo se admite sin cursor: combinados, cada página
+    saltaría filas. ValueError si vienen ambos o el cursor no es válido.
+
+    Pide una fila de más para saber si hay página siguiente (ver `separar_pagina`).
+    """
+    if cursor and skip:
+        raise ValueError("Use cursor o skip, no ambos")
+    if cursor:
+        valores = decodificar_cursor(cursor, len(columnas))
+        if len(columnas) == 1:
+            clave, ultimo = columnas[0], valores[0]
+        else:
+            clave, ultimo = tuple_(*columnas), tuple_(*valores)
+        query = query.where(clave < ultimo if descendente else clave > ultimo)
+    orden = [columna.desc() for columna in columnas] if descendente else columnas
+    return query.order_by(*orden).offset(skip).limit(limit + 1)
+
+def separar_pagina(filas: list, limit: int, clave) -> Tuple[List, Optional[str]]:
+    """Filas de la página y cursor de la siguiente (None si es la última);
+    `clave(fila)` devuelve la lista de valores de la clave de orden."""
+    if limit <= 0:
+        return [], None
+    if len(filas) <= limit:
+        return filas, None
+    filas = filas[:limit]
+    return filas, codificar_cursor(clave(filas[-1]))
@@ -0,0 +1,16 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Constructores de INSERT con soporte de ON CONFLICT por dialecto
+_INSERTS_CON_CONFLICTO = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def dialect_insert(db: AsyncSession, model_class):
+    """Devuelve un INSERT del dialecto de la sesión (con on_conflict_do_update/nothing)."""
+    dialecto = db.get_bind().dialect.name
+    try:
+        return _INSERTS_CON_CONFLICTO[dialecto](model_class)
+    except KeyError:
+        raise RuntimeError(f"Dialecto no soportado para inserciones masivas: {dialecto}")
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from app.config.database import Base
+
+class EstadisticaResumenModel(Base):
+    """Conteos precalculados de los estudiantes de cada usuario por dimensión
+    (semestre, colegio, municipio, nivel de riesgo, rango de promedio)."""
+    __tablename__ = "estadistica_resumen"
+
+    __table_args__ = (
+        Index('uq_estadistica_resumen', 'usuario_id', 'dimension', 'grupo', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey('usuario.id', ondelete='CASCADE'), nullable=False)
+    dimension = Column(String, nullable=False)
+    grupo = Column(String, nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+    suma_promedio = Column(Float, nullable=False, default=0.0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
@@ -7,6 +7,19 @@ class EstudianteModel(Base):
 
     __table_args__ = (
         UniqueConstraint('codigo', 'documento', name='uq_codigo_documento'),
+        # Filtros y orden del listado de estudiantes (el id desempata el cursor)
+        Index('ix_estudiante_semestre', 'semestre', 'id'),
+        Index('ix_estudiante_estado_matricula', 'estado_matricula_id', 'id'),
+        Index('ix_estudiante_colegio', 'colegio_egresado_id', 'id'),
+        Index('ix_estudiante_nombre', 'nombre', 'id'),
+        # Búsqueda: prefijo de código y documento (text_pattern_ops permite
+        # LIKE 'x%' con cualquier collation en PostgreSQL) y trigramas del nombre
+        Index('ix_estudiante_codigo_prefijo', 'codigo', postgresql_ops={'codigo': 'text_pattern_ops'}),
+        Index('ix_estudiante_documento_prefijo', 'documento', postgresql_ops={'documento': 'text_pattern_ops'}),
+        Index(
+            'ix_estudiante_nombre_trgm', 'nombre',
+            postgresql_using='gin', postgresql_ops={'nombre': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -23,6 +36,8 @@ class EstudianteModel(Base):
     email_institucional = Column(String, nullable=False)
     colegio_egresado_id = Column(Integer, ForeignKey('colegio_egresado.id'), nullable=False)
     municipio_nacimiento_id = Column(Integer, ForeignKey('municipio_nacimiento.id'), nullable=False)
+    # Huella del contenido importado (incluye el promedio); permite omitir filas sin cambios
+    huella = Column(String, nullable=True)
 
     # Relaciones
     tipo_documento = relationship("TipoDocumentoModel", back_populates="estudiantes")
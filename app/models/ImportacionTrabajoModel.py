@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, ForeignKey, Index
+from app.config.database import Base
+from datetime import datetime
+
+class ImportacionTrabajoModel(Base):
+    """Estado y avance de las importaciones en segundo plano. Se guarda en la
+    base para que cualquier worker pueda consultarlas o cancelarlas."""
+    __tablename__ = "importacion_trabajo"
+
+    __table_args__ = (
+        # Listado de importaciones del usuario
+        Index('ix_importacion_trabajo_usuario', 'usuario_id', 'creado'),
+    )
+
+    id = Column(String, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey('usuario.id', ondelete='CASCADE'), nullable=False)
+    archivo = Column(String, nullable=False)
+    estado = Column(String, nullable=False)
+    filas_procesadas = Column(Integer, nullable=False, default=0)
+    estudiantes_creados = Column(Integer, nullable=False, default=0)
+    estudiantes_actualizados = Column(Integer, nullable=False, default=0)
+    estudiantes_sin_cambios = Column(Integer, nullable=False, default=0)
+    filas_fallidas = Column(Integer, nullable=False, default=0)
+    catalogos_creados = Column(Integer, nullable=False, default=0)
+    errores = Column(JSON, nullable=False, default=list)
+    mensaje = Column(String, nullable=True)
+    # Pedida desde otro worker: el que ejecuta el trabajo la atiende entre bloques
+    cancelacion_solicitada = Column(Boolean, nullable=False, default=False)
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finalizado = Column(DateTime, nullable=True)
@@ -1,13 +1,23 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
 class MetricaEvaluacionModel(Base):
     __tablename__ = "metrica_evaluacion"
 
+    __table_args__ = (
+        Index('uq_metrica_estudiante', 'estudiante_id', unique=True),
+        # Rangos de promedio / nivel de riesgo y orden por promedio en el listado
+        Index('ix_metrica_promedio', 'promedio', 'estudiante_id'),
+        Index('ix_metrica_nivel_riesgo', 'nivel_riesgo', 'estudiante_id'),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     estudiante_id = Column(Integer, ForeignKey('estudiante.id'), nullable=False)
     promedio = Column(Float, nullable=False)
+    # Nivel de riesgo derivado del promedio con los umbrales de configuración;
+    # se escribe junto con el promedio (ver estadisticasService.calcular_nivel_riesgo)
+    nivel_riesgo = Column(String, nullable=True)
 
     # Relaciones
     estudiante = relationship("EstudianteModel", back_populates="metricas_evaluacion") 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 from datetime import datetime
@@ -6,6 +6,10 @@ from datetime import datetime
 class UsuarioEstudianteModel(Base):
     __tablename__ = "usuario_estudiante"
 
+    __table_args__ = (
+        Index('uq_usuario_estudiante', 'usuario_id', 'estudiante_id', unique=True),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     usuario_id = Column(Integer, ForeignKey('usuario.id'), nullable=False)
     estudiante_id = Column(Integer, ForeignKey('estudiante.id'), nullable=False)
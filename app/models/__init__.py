@@ -7,7 +7,9 @@ from app.models.ColegioEgresadoModel import ColegioEgresadoModel
 from app.models.MunicipioNacimientoModel import MunicipioNacimientoModel
 from app.models.UsuarioEstudianteModel import UsuarioEstudianteModel
 from app.models.MetricaEvaluacionModel import MetricaEvaluacionModel
-from sqlalchemy import inspect, text
+from app.models.EstadisticaResumenModel import EstadisticaResumenModel
+from app.models.ImportacionTrabajoModel import ImportacionTrabajoModel
+from sqlalchemy import inspect, select, delete, func
 
 # Lista de todos los modelos para asegurar que están registrados
 models = [
@@ -18,19 +20,22 @@ models = [
     ColegioEgresadoModel,
     MunicipioNacimientoModel,
     UsuarioEstudianteModel,
-    MetricaEvaluacionModel
+    MetricaEvaluacionModel,
+    EstadisticaResumenModel,
+    ImportacionTrabajoModel
 ]
 
 async def create_tables():
     """Crea las tablas en la base de datos si no existen."""
     async with engine.begin() as conn:
-        # Verificar qué tablas ya existen usando una consulta SQL directa
-        result = await conn.execute(text("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public'
-        """))
-        existing_tables = {row[0] for row in result}
+        # Extensiones e índices de texto de la búsqueda de estudiantes
+        await conn.run_sync(_preparar_extensiones)
+
+        # Verificar qué tablas ya existen (con el inspector, válido para
+        # PostgreSQL y para SQLite en desarrollo local)
+        existing_tables = set(await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).get_table_names()
+        ))
         
         # Obtener todas las tablas que necesitamos crear
         tables_to_create = {
@@ -53,4 +58,76 @@ async def create_tables():
                 tables=[table.__table__ for table in missing_tables.values()]
             ))
         else:
-            print("Todas las tablas ya existen en la base de datos") 
\ No newline at end of file
+            print("Todas las tablas ya existen en la base de datos")
+
+        # Agregar las columnas nuevas y crear los índices declarados en los
+        # modelos que aún no existan (las tablas creadas antes no los tienen)
+        await conn.run_sync(_agregar_columnas_faltantes)
+        await conn.run_sync(_crear_indices_faltantes)
+        await conn.run_sync(_crear_indice_busqueda)
+
+def _agregar_columnas_faltantes(sync_conn):
+    # Solo columnas que admiten NULL: las filas existentes quedan en NULL
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existentes = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existentes and column.nullable:
+                tipo = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}")
+
+def _crear_indices_faltantes(sync_conn):
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existentes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existentes:
+                continue
+            if index.unique:
+                _eliminar_duplicados(sync_conn, index)
+            index.create(bind=sync_conn, checkfirst=True)
+
+def _eliminar_duplicados(sync_conn, index):
+    # Una tabla creada antes del índice único puede tener filas repetidas en
+    # sus columnas y el índice no podría crearse: se conserva la más reciente
+    # (mayor id) de cada grupo
+    table = index.table
+    conservar = select(func.max(table.c.id)).group_by(*index.columns)
+    result = sync_conn.execute(delete(table).where(table.c.id.not_in(conservar)))
+    if result.rowcount:
+        print(f"Eliminadas {result.rowcount} filas repetidas de {table.name} para crear {index.name}")
+
+def _preparar_extensiones(sync_conn):
+    # pg_trgm: índice GIN de trigramas para la búsqueda aproximada por nombre
+    if sync_conn.dialect.name == "postgresql":
+        sync_conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+def _crear_indice_busqueda(sync_conn):
+    # En SQLite la búsqueda aproximada por nombre usa una tabla FTS5 con
+    # tokenizador de trigramas, de contenido externo (estudiante) y
+    # sincronizada con triggers
+    if sync_conn.dialect.name != "sqlite":
+        return
+    if "estudiante_busqueda" in inspect(sync_conn).get_table_names():
+        return
+    sync_conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE estudiante_busqueda USING fts5("
+        "nombre, content='estudiante', content_rowid='id', tokenize='trigram')"
+    )
+    sync_conn.exec_driver_sql(
+        "CREATE TRIGGER estudiante_busqueda_ai AFTER INSERT ON estudiante BEGIN "
+        "INSERT INTO estudiante_busqueda(rowid, nombre) VALUES (new.id, new.nombre); END"
+    )
+    sync_conn.exec_driver_sql(
+        "CREATE TRIGGER estudiante_busqueda_ad AFTER DELETE ON estudiante BEGIN "
+        "INSERT INTO estudiante_busqueda(estudiante_busqueda, rowid, nombre) "
+        "VALUES ('delete', old.id, old.nombre); END"
+    )
+    sync_conn.exec_driver_sql(
+        "CREATE TRIGGER estudiante_busqueda_au AFTER UPDATE OF nombre ON estudiante BEGIN "
+        "INSERT INTO estudiante_busqueda(estudiante_busqueda, rowid, nombre) "
+        "VALUES ('delete', old.id, old.nombre); "
+        "INSERT INTO estudiante_busqueda(rowid, nombre) VALUES (new.id, new.nombre); END"
+    )
+    # Indexar los estudiantes que ya existían
+    sync_conn.exec_driver_sql("INSERT INTO estudiante_busqueda(estudiante_busqueda) VALUES ('rebuild')")
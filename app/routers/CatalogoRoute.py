@@ -7,6 +7,7 @@ from app.models.EstadoMatriculaModel import EstadoMatriculaModel
 from app.models.ColegioEgresadoModel import ColegioEgresadoModel
 from app.models.MunicipioNacimientoModel import MunicipioNacimientoModel
 from app.schemas.catalogs import (
+    CatalogBulkCreate, CatalogBulkResult,
     TipoDocumento, TipoDocumentoCreate,
     EstadoMatricula, EstadoMatriculaCreate,
     ColegioEgresado, ColegioEgresadoCreate,
@@ -15,6 +16,7 @@ from app.schemas.catalogs import (
 from sqlalchemy import select, delete
 from app.auth.authUtils import get_current_user
 from app.models.UsuarioModel import UsuarioModel
+from app.services.catalogoService import insertar_faltantes
 
 router = APIRouter(tags=["catálogos"])
 
@@ -26,6 +28,15 @@ async def create_catalog_item(item_create, model_class, db: AsyncSession):
     await db.refresh(db_item)
     return db_item
 
+async def create_catalog_items(items_create: CatalogBulkCreate, model_class, db: AsyncSession):
+    ids, creados = await insertar_faltantes(db, model_class, items_create.nombres)
+    await db.commit()
+    return CatalogBulkResult(
+        creados=creados,
+        existentes=len(ids) - creados,
+        items=[{"id": item_id, "nombre": nombre} for nombre, item_id in ids.items()]
+    )
+
 async def get_catalog_items(model_class, db: AsyncSession):
     query = select(model_class)
     result = await db.execute(query)
@@ -56,6 +67,14 @@ async def create_tipo_documento(
 ):
     return await create_catalog_item(tipo, TipoDocumentoModel, db)
 
+@router.post("/tipos-documento/lote/", response_model=CatalogBulkResult)
+async def create_tipos_documento_lote(
+    items: CatalogBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    return await create_catalog_items(items, TipoDocumentoModel, db)
+
 @router.get("/tipos-documento/", response_model=List[TipoDocumento])
 async def read_tipos_documento(
     db: AsyncSession = Depends(get_db),
@@ -88,6 +107,14 @@ async def create_estado_matricula(
 ):
     return await create_catalog_item(estado, EstadoMatriculaModel, db)
 
+@router.post("/estados-matricula/lote/", response_model=CatalogBulkResult)
+async def create_estados_matricula_lote(
+    items: CatalogBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    return await create_catalog_items(items, EstadoMatriculaModel, db)
+
 @router.get("/estados-matricula/", response_model=List[EstadoMatricula])
 async def read_estados_matricula(
     db: AsyncSession = Depends(get_db),
@@ -120,6 +147,14 @@ async def create_colegio(
 ):
     return await create_catalog_item(colegio, ColegioEgresadoModel, db)
 
+@router.post("/colegios/lote/", response_model=CatalogBulkResult)
+async def create_colegios_lote(
+    items: CatalogBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    return await create_catalog_items(items, ColegioEgresadoModel, db)
+
 @router.get("/colegios/", response_model=List[ColegioEgresado])
 async def read_colegios(
     db: AsyncSession = Depends(get_db),
@@ -152,6 +187,14 @@ async def create_municipio(
 ):
     return await create_catalog_item(municipio, MunicipioNacimientoModel, db)
 
+@router.post("/municipios/lote/", response_model=CatalogBulkResult)
+async def create_municipios_lote(
+    items: CatalogBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    return await create_catalog_items(items, MunicipioNacimientoModel, db)
+
 @router.get("/municipios/", response_model=List[MunicipioNacimiento])
 async def read_municipios(
     db: AsyncSession = Depends(get_db),
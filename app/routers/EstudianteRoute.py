@@ -1,36 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.config.database import get_db
 from app.models.EstudianteModel import EstudianteModel
 from app.schemas.estudiante import (
     EstudianteCreate, Estudiante, EstudianteUpdate, 
     EstudianteConRiesgo, ListaEstudiantesResponse, 
-    NivelRiesgo, TipoEstadistica, EstadisticasResponse,
-    EstadisticaPromedio, EstadisticaGeneral, EstadisticaItem
+    TipoEstadistica, EstadisticasResponse, TipoDiagrama, FormatoDiagrama,
+    DimensionCruce, EstadisticaCruzadaResponse, HistogramaPromedioResponse, ModoTotal,
+    NivelRiesgo, OrdenEstudiantes, DireccionOrden
 )
-from sqlalchemy import select, update, delete, func, case
+from sqlalchemy import select, delete, func
 from app.auth.authUtils import get_current_user
 from app.models.UsuarioModel import UsuarioModel
 from app.models.MetricaEvaluacionModel import MetricaEvaluacionModel
 from app.models.UsuarioEstudianteModel import UsuarioEstudianteModel
-from app.models.TipoDocumentoModel import TipoDocumentoModel
-from app.models.EstadoMatriculaModel import EstadoMatriculaModel
-from app.models.ColegioEgresadoModel import ColegioEgresadoModel
-from app.models.MunicipioNacimientoModel import MunicipioNacimientoModel
-import pandas as pd
-import io
-import matplotlib.pyplot as plt
+from app.services.importacionService import (
+    ImportadorEstudiantes, ErrorValidacion, leer_siguiente_bloque, MedicionMemoria
+)
+from app.services.lectoresArchivo import (
+    verificar_columnas, detectar_formato, leer_archivo, leer_por_bloques, guardar_temporal
+)
+from app.services.diagramasService import (
+    obtener_grafico, clave_grafico, especificacion_vega_lite,
+    datos_grafico, titulo_grafico, diagramas_tablero
+)
+from app.services.graficosService import TIPOS_CONTENIDO_GRAFICO
+from app.core.config import CACHE_GRAFICOS_CONTROL
+from app.services.busquedaService import buscar_estudiantes
+from app.services.estadisticasService import (
+    calcular_estadisticas, calcular_varias_estadisticas, calcular_estadistica_cruzada,
+    calcular_histograma_promedio, bordes_por_ancho, MAX_INTERVALOS_HISTOGRAMA,
+    contar_estudiantes_resumen, ajustar_resumen, marcar_usuarios_modificados
+)
+from app.core.ejecutores import ejecutar_en_hilo, ejecutar_en_proceso, EjecutorSaturado
+from app.core.paginacion import aplicar_cursor, separar_pagina, ENCABEZADO_CURSOR, LIMITE_MAXIMO_PAGINA
+from app.services.trabajosImportacionService import (
+    encolar_importacion, obtener_trabajo, listar_trabajos, cancelar_trabajo
+)
+from app.schemas.importacion import TrabajoImportacion
+import os
+import json
+import math
 import base64
-from enum import Enum
 
 router = APIRouter(prefix="/estudiantes", tags=["estudiantes"])
 
-class TipoDiagrama(str, Enum):
-    BARRAS = "barras"
-    TORTA = "torta"
-    LINEAS = "lineas"
-
 @router.post("/", response_model=Estudiante)
 async def create_estudiante(
     estudiante: EstudianteCreate, 
@@ -39,22 +56,45 @@ async def create_estudiante(
 ):
     db_estudiante = EstudianteModel(**estudiante.dict())
     db.add(db_estudiante)
+    marcar_usuarios_modificados(db, [current_user.id])
     await db.commit()
     await db.refresh(db_estudiante)
     return db_estudiante
 
 @router.get("/", response_model=List[Estudiante])
 async def read_estudiantes(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
-    query = select(EstudianteModel).offset(skip).limit(limit)
+    """Estudiantes ordenados por id; el cursor de la página siguiente va en
+    el encabezado X-Next-Cursor (recorrido completo sin OFFSET)."""
+    try:
+        query = aplicar_cursor(select(EstudianteModel), [EstudianteModel.id], cursor, limit, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     result = await db.execute(query)
-    estudiantes = result.scalars().all()
+    estudiantes, next_cursor = separar_pagina(result.scalars().all(), limit, lambda e: [e.id])
+    if next_cursor:
+        response.headers[ENCABEZADO_CURSOR] = next_cursor
     return estudiantes
 
+@router.get("/buscar/", response_model=List[Estudiante])
+async def buscar_estudiantes_usuario(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Busca entre los estudiantes del usuario por nombre (tolera errores de
+    tipeo), código o documento (exacto o por prefijo)."""
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El término de búsqueda está vacío")
+    return await buscar_estudiantes(db, current_user.id, q, limit)
+
 @router.get("/{estudiante_id}", response_model=Estudiante)
 async def read_estudiante(
     estudiante_id: int, 
@@ -82,9 +122,15 @@ async def update_estudiante(
     if db_estudiante is None:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
 
+    # Resumen de estadísticas: quitar el aporte anterior y sumar el nuevo
+    await ajustar_resumen(db, [estudiante_id], -1)
     update_data = estudiante.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_estudiante, key, value)
+    # La huella ya no refleja el contenido: la próxima importación lo compara de nuevo
+    db_estudiante.huella = None
+    await db.flush()
+    await ajustar_resumen(db, [estudiante_id], 1)
 
     await db.commit()
     await db.refresh(db_estudiante)
@@ -96,6 +142,7 @@ async def delete_estudiante(
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
+    await ajustar_resumen(db, [estudiante_id], -1)
     query = delete(EstudianteModel).where(EstudianteModel.id == estudiante_id)
     result = await db.execute(query)
     await db.commit()
@@ -105,170 +152,107 @@ async def delete_estudiante(
 
 @router.post("/cargar-excel/")
 async def cargar_estudiantes_excel(
+    response: Response,
     file: UploadFile = File(...),
+    streaming: bool = False,
+    en_segundo_plano: bool = False,
+    omitir_invalidos: bool = False,
+    usar_copy: bool = False,
+    crear_catalogos: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
-    if not file.filename.endswith('.xlsx'):
+    formato = detectar_formato(file.filename, file.content_type)
+    if formato is None:
         raise HTTPException(
             status_code=400,
-            detail="El archivo debe ser un Excel (.xlsx)"
+            detail="El archivo debe ser Excel (.xlsx), CSV (.csv), Parquet (.parquet) o Arrow (.arrow)"
         )
 
+    if en_segundo_plano:
+        # Encolar la importación (siempre por bloques) y responder de inmediato;
+        # el avance se consulta en /estudiantes/importaciones/{trabajo_id}
+        trabajo = await encolar_importacion(
+            db, file, formato, current_user.id, omitir_invalidos, usar_copy, crear_catalogos
+        )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "message": "Importación encolada",
+            "trabajo_id": trabajo.id,
+            "estado": trabajo.estado
+        }
+
+    memoria = MedicionMemoria()
+    importador = ImportadorEstudiantes(
+        db, current_user.id,
+        omitir_invalidos=omitir_invalidos,
+        usar_copy=usar_copy,
+        crear_catalogos=crear_catalogos,
+        memoria=memoria
+    )
     try:
-        # Leer el archivo Excel
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        # Verificar las columnas requeridas
-        columnas_requeridas = [
-            'Codigo Alumno', 'Nombre Alumno', 'Tipo Doc', 'Documento',
-            'Semestre', 'Pensum', 'Ingreso', 'Promedio', 'Estado Matricula',
-            'Celular', 'Email', 'Email Institucional', 'Colegio Egresado',
-            'Municipio Nacimiento'
-        ]
-        
-        columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
-        if columnas_faltantes:
-            raise ValueError(f"Faltan las siguientes columnas en el Excel: {', '.join(columnas_faltantes)}")
-        
-        # Obtener catálogos existentes
-        tipo_docs = await db.execute(select(TipoDocumentoModel))
-        tipo_docs_dict = {td.nombre: td.id for td in tipo_docs.scalars().all()}
-        
-        estados = await db.execute(select(EstadoMatriculaModel))
-        estados_dict = {em.nombre: em.id for em in estados.scalars().all()}
-        
-        colegios = await db.execute(select(ColegioEgresadoModel))
-        colegios_dict = {ce.nombre: ce.id for ce in colegios.scalars().all()}
-        
-        municipios = await db.execute(select(MunicipioNacimientoModel))
-        municipios_dict = {mn.nombre: mn.id for mn in municipios.scalars().all()}
-
-        estudiantes_creados = []
-        estudiantes_actualizados = []
-        
-        # Procesar cada fila del Excel
-        for index, row in df.iterrows():
+        if streaming:
+            # Leer el archivo temporal de la subida por bloques; cada bloque
+            # se valida, se escribe y se confirma antes de leer el siguiente
+            lector = leer_por_bloques(file.file, formato)
+            try:
+                while (bloque := await leer_siguiente_bloque(lector)) is not None:
+                    await importador.procesar(bloque)
+                    await db.commit()
+            finally:
+                lector.close()
+        else:
+            # Leer el archivo en el pool de procesos; el archivo de la subida
+            # no se puede enviar a otro proceso, se pasa su copia en disco
+            ruta = await ejecutar_en_hilo(guardar_temporal, file.file, f".{formato}")
             try:
-                # Validar que los catálogos existan
-                tipo_doc = tipo_docs_dict.get(row['Tipo Doc'])
-                if not tipo_doc:
-                    raise ValueError(f"Tipo de documento no encontrado: {row['Tipo Doc']}")
-                
-                estado = estados_dict.get(row['Estado Matricula'])
-                if not estado:
-                    raise ValueError(f"Estado de matrícula no encontrado: {row['Estado Matricula']}")
-                
-                colegio = colegios_dict.get(row['Colegio Egresado'])
-                if not colegio:
-                    raise ValueError(f"Colegio no encontrado: {row['Colegio Egresado']}")
-                
-                municipio = municipios_dict.get(row['Municipio Nacimiento'])
-                if not municipio:
-                    raise ValueError(f"Municipio no encontrado: {row['Municipio Nacimiento']}")
-
-                # Verificar si el estudiante ya existe
-                estudiante_existente = await db.execute(
-                    select(EstudianteModel).where(
-                        (EstudianteModel.codigo == str(row['Codigo Alumno'])) &
-                        (EstudianteModel.documento == str(row['Documento']))
-                    )
-                )
-                estudiante = estudiante_existente.scalar_one_or_none()
-
-                if estudiante:
-                    # Actualizar estudiante existente
-                    estudiante.nombre = str(row['Nombre Alumno'])
-                    estudiante.tipo_documento_id = tipo_doc
-                    estudiante.semestre = str(row['Semestre'])
-                    estudiante.pensum = str(row['Pensum'])
-                    estudiante.ingreso = str(row['Ingreso'])
-                    estudiante.estado_matricula_id = estado
-                    estudiante.celular = str(row['Celular']) if pd.notna(row['Celular']) else None
-                    estudiante.email_personal = str(row['Email']) if pd.notna(row['Email']) else None
-                    estudiante.email_institucional = str(row['Email Institucional'])
-                    estudiante.colegio_egresado_id = colegio
-                    estudiante.municipio_nacimiento_id = municipio
-                    estudiantes_actualizados.append(estudiante)
-                else:
-                    # Crear nuevo estudiante
-                    estudiante = EstudianteModel(
-                        codigo=str(row['Codigo Alumno']),
-                        nombre=str(row['Nombre Alumno']),
-                        tipo_documento_id=tipo_doc,
-                        documento=str(row['Documento']),
-                        semestre=str(row['Semestre']),
-                        pensum=str(row['Pensum']),
-                        ingreso=str(row['Ingreso']),
-                        estado_matricula_id=estado,
-                        celular=str(row['Celular']) if pd.notna(row['Celular']) else None,
-                        email_personal=str(row['Email']) if pd.notna(row['Email']) else None,
-                        email_institucional=str(row['Email Institucional']),
-                        colegio_egresado_id=colegio,
-                        municipio_nacimiento_id=municipio
-                    )
-                    db.add(estudiante)
-                    estudiantes_creados.append(estudiante)
-
-                await db.flush()
-
-                # Actualizar o crear métrica de evaluación
-                try:
-                    promedio = float(row['Promedio'])
-                    promedio = round(promedio, 2)
-                except (ValueError, TypeError):
-                    raise ValueError(f"El promedio debe ser un número válido. Valor recibido: {row['Promedio']}")
-
-                # Buscar métrica existente
-                metrica_existente = await db.execute(
-                    select(MetricaEvaluacionModel).where(
-                        MetricaEvaluacionModel.estudiante_id == estudiante.id
-                    )
-                )
-                metrica = metrica_existente.scalar_one_or_none()
-
-                if metrica:
-                    metrica.promedio = promedio
-                else:
-                    metrica = MetricaEvaluacionModel(
-                        estudiante_id=estudiante.id,
-                        promedio=promedio
-                    )
-                    db.add(metrica)
-
-                # Verificar y crear relación usuario-estudiante si no existe
-                relacion_existente = await db.execute(
-                    select(UsuarioEstudianteModel).where(
-                        (UsuarioEstudianteModel.usuario_id == current_user.id) &
-                        (UsuarioEstudianteModel.estudiante_id == estudiante.id)
-                    )
-                )
-                if not relacion_existente.scalar_one_or_none():
-                    usuario_estudiante = UsuarioEstudianteModel(
-                        usuario_id=current_user.id,
-                        estudiante_id=estudiante.id
-                    )
-                    db.add(usuario_estudiante)
-
-            except Exception as row_error:
-                raise ValueError(f"Error en la fila {index + 2}: {str(row_error)}")
-
-        # Guardar todos los cambios
-        await db.commit()
+                df = await ejecutar_en_proceso(leer_archivo, ruta, formato)
+            finally:
+                os.remove(ruta)
+            memoria.muestrear()
+
+            # Verificar las columnas requeridas
+            verificar_columnas(df.columns)
+
+            # Validar todas las filas y escribirlas por lotes
+            await importador.procesar(df)
+
+            # Guardar todos los cambios
+            await db.commit()
 
         return {
             "message": f"Proceso completado exitosamente",
-            "estudiantes_creados": len(estudiantes_creados),
-            "estudiantes_actualizados": len(estudiantes_actualizados)
+            "estudiantes_creados": importador.creados,
+            "estudiantes_actualizados": importador.actualizados,
+            "estudiantes_sin_cambios": importador.sin_cambios,
+            "filas_fallidas": importador.fallidos,
+            "catalogos_creados": importador.catalogos_creados,
+            "errores": importador.errores,
+            "modo_escritura": importador.modo_escritura,
+            "memoria_pico_mb": memoria.pico_mb
         }
 
+    except ErrorValidacion as ev:
+        await db.rollback()
+        # Reporte completo de filas inválidas; en modo streaming los bloques
+        # anteriores al que falló ya quedaron guardados
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"Error al procesar el archivo: {len(ev.errores)} filas con errores",
+                "errores": ev.errores,
+                "estudiantes_guardados": importador.creados + importador.actualizados
+            }
+        )
     except ValueError as ve:
         await db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Error al procesar el archivo: {str(ve)}"
         )
+    except EjecutorSaturado:
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -276,28 +260,87 @@ async def cargar_estudiantes_excel(
             detail=f"Error interno al procesar el archivo: {str(e)}"
         )
 
-def calcular_nivel_riesgo(promedio: float) -> NivelRiesgo:
-    if 0.0 <= promedio <= 1.0:
-        return NivelRiesgo.ALTO
-    elif 1.1 <= promedio <= 2.9:
-        return NivelRiesgo.MEDIO
-    else:
-        return NivelRiesgo.BAJO
+@router.get("/importaciones/", response_model=List[TrabajoImportacion])
+async def listar_importaciones(
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    return await listar_trabajos(db, current_user.id)
+
+@router.get("/importaciones/{trabajo_id}", response_model=TrabajoImportacion)
+async def obtener_importacion(
+    trabajo_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Estado y avance de una importación en segundo plano; se lee de la base,
+    así que responde cualquier worker."""
+    trabajo = await obtener_trabajo(db, trabajo_id, current_user.id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return trabajo
+
+@router.post("/importaciones/{trabajo_id}/cancelar", response_model=TrabajoImportacion)
+async def cancelar_importacion(
+    trabajo_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Cancela una importación. Si la ejecuta otro worker, la respuesta puede
+    seguir en curso: ese worker la detiene al terminar el bloque actual."""
+    trabajo = await cancelar_trabajo(db, trabajo_id, current_user.id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return trabajo
+
+# Columnas de orden del listado de estudiantes del usuario; el id desempata
+# y completa una clave única para el cursor (ver índices de los modelos)
+COLUMNAS_ORDEN_ESTUDIANTES = {
+    OrdenEstudiantes.ID: [UsuarioEstudianteModel.estudiante_id],
+    OrdenEstudiantes.CODIGO: [EstudianteModel.codigo, EstudianteModel.id],
+    OrdenEstudiantes.NOMBRE: [EstudianteModel.nombre, EstudianteModel.id],
+    OrdenEstudiantes.SEMESTRE: [EstudianteModel.semestre, EstudianteModel.id],
+    OrdenEstudiantes.PROMEDIO: [MetricaEvaluacionModel.promedio, MetricaEvaluacionModel.estudiante_id],
+}
 
 @router.get("/mis-estudiantes/", response_model=ListaEstudiantesResponse)
 async def listar_estudiantes_usuario(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    cursor: Optional[str] = None,
+    total: ModoTotal = ModoTotal.EXACTO,
+    nivel_riesgo: Optional[NivelRiesgo] = None,
+    semestre: Optional[str] = None,
+    estado_matricula_id: Optional[int] = None,
+    colegio_egresado_id: Optional[int] = None,
+    promedio_min: Optional[float] = None,
+    promedio_max: Optional[float] = None,
+    orden: OrdenEstudiantes = OrdenEstudiantes.ID,
+    direccion: DireccionOrden = DireccionOrden.ASC
 ):
+    """Estudiantes del usuario con su nivel de riesgo, filtrados y ordenados
+    en la base de datos.
+
+    Para páginas profundas use `cursor` con el `next_cursor` de la respuesta
+    anterior en lugar de `skip`, con los mismos filtros y orden.
+
+    `total`: `exacto` lo cuenta en la misma consulta de la página (con cursor,
+    en una consulta aparte), `estimado` lo lee de la tabla de resumen de
+    estadísticas (costo constante; con filtros se cuenta exacto) y `omitir`
+    no lo calcula.
+    """
     # Consulta para obtener los estudiantes del usuario con sus métricas
     query = select(
+        UsuarioEstudianteModel.estudiante_id,
         EstudianteModel.codigo,
         EstudianteModel.nombre,
         EstudianteModel.semestre,
         EstudianteModel.email_institucional,
-        MetricaEvaluacionModel.promedio
+        MetricaEvaluacionModel.promedio,
+        MetricaEvaluacionModel.nivel_riesgo
     ).join(
         UsuarioEstudianteModel,
         EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
@@ -306,22 +349,60 @@ async def listar_estudiantes_usuario(
         EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
     ).where(
         UsuarioEstudianteModel.usuario_id == current_user.id
-    ).offset(skip).limit(limit)
+    )
 
-    result = await db.execute(query)
-    estudiantes_raw = result.all()
+    filtros = []
+    if nivel_riesgo is not None:
+        filtros.append(MetricaEvaluacionModel.nivel_riesgo == nivel_riesgo.value)
+    if semestre is not None:
+        filtros.append(EstudianteModel.semestre == semestre)
+    if estado_matricula_id is not None:
+        filtros.append(EstudianteModel.estado_matricula_id == estado_matricula_id)
+    if colegio_egresado_id is not None:
+        filtros.append(EstudianteModel.colegio_egresado_id == colegio_egresado_id)
+    if promedio_min is not None:
+        filtros.append(MetricaEvaluacionModel.promedio >= promedio_min)
+    if promedio_max is not None:
+        filtros.append(MetricaEvaluacionModel.promedio <= promedio_max)
+    if filtros:
+        query = query.where(*filtros)
 
-    # Contar el total de estudiantes sin el límite
-    query_count = select(
-        EstudianteModel
-    ).join(
-        UsuarioEstudianteModel,
-        EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-    ).where(
-        UsuarioEstudianteModel.usuario_id == current_user.id
+    try:
+        pagina = aplicar_cursor(
+            query, COLUMNAS_ORDEN_ESTUDIANTES[orden], cursor, limit, skip,
+            descendente=direccion == DireccionOrden.DESC
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    campos_clave = ['estudiante_id'] if orden == OrdenEstudiantes.ID else [orden.value, 'estudiante_id']
+    if total == ModoTotal.ESTIMADO and filtros:
+        total = ModoTotal.EXACTO
+    contar_en_pagina = total == ModoTotal.EXACTO and not cursor
+    if contar_en_pagina:
+        # Conteo por ventana: se evalúa antes del OFFSET/LIMIT
+        pagina = pagina.add_columns(func.count().over().label('total'))
+
+    result = await db.execute(pagina)
+    estudiantes_raw, next_cursor = separar_pagina(
+        result.all(), limit, lambda fila: [getattr(fila, campo) for campo in campos_clave]
     )
-    result_count = await db.execute(query_count)
-    total = len(result_count.scalars().all())
+
+    cantidad_total = None
+    if total == ModoTotal.EXACTO:
+        if contar_en_pagina and estudiantes_raw:
+            cantidad_total = estudiantes_raw[0].total
+        elif cursor or skip:
+            # Con cursor la ventana solo vería las filas siguientes, y una
+            # página vacía no devuelve filas: se cuenta aparte
+            result_count = await db.execute(select(func.count()).select_from(query.subquery()))
+            cantidad_total = result_count.scalar()
+        else:
+            cantidad_total = 0
+    elif total == ModoTotal.ESTIMADO:
+        cantidad_total = await contar_estudiantes_resumen(db, current_user.id)
+
+    if next_cursor:
+        response.headers[ENCABEZADO_CURSOR] = next_cursor
 
     # Convertir los resultados al formato requerido
     estudiantes = [
@@ -330,7 +411,7 @@ async def listar_estudiantes_usuario(
             nombre=estudiante.nombre,
             semestre=estudiante.semestre,
             email_institucional=estudiante.email_institucional,
-            nivel_riesgo=calcular_nivel_riesgo(estudiante.promedio),
+            nivel_riesgo=estudiante.nivel_riesgo,
             promedio=round(estudiante.promedio, 2)
         )
         for estudiante in estudiantes_raw
@@ -338,7 +419,8 @@ async def listar_estudiantes_usuario(
 
     return ListaEstudiantesResponse(
         estudiantes=estudiantes,
-        total=total
+        total=cantidad_total,
+        next_cursor=next_cursor
     )
 
 @router.get("/estadisticas/", response_model=EstadisticasResponse)
@@ -347,268 +429,183 @@ async def obtener_estadisticas(
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
-    # Base query para obtener estudiantes del usuario actual
-    base_query = select(EstudianteModel).join(
-        UsuarioEstudianteModel,
-        EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-    ).where(
-        UsuarioEstudianteModel.usuario_id == current_user.id
-    )
+    return await calcular_estadisticas(db, current_user.id, tipo)
 
-    if tipo == TipoEstadistica.PROMEDIO:
-        # Obtener estadísticas de promedio
-        query = select(
-            func.avg(MetricaEvaluacionModel.promedio).label('promedio_general'),
-            func.count().label('total'),
-            func.sum(
-                case(
-                    (MetricaEvaluacionModel.promedio <= 1.0, 1),
-                    else_=0
-                )
-            ).label('rango_0_1'),
-            func.sum(
-                case(
-                    ((MetricaEvaluacionModel.promedio > 1.0) & (MetricaEvaluacionModel.promedio <= 2.0), 1),
-                    else_=0
-                )
-            ).label('rango_1_2'),
-            func.sum(
-                case(
-                    ((MetricaEvaluacionModel.promedio > 2.0) & (MetricaEvaluacionModel.promedio <= 3.0), 1),
-                    else_=0
-                )
-            ).label('rango_2_3'),
-            func.sum(
-                case(
-                    ((MetricaEvaluacionModel.promedio > 3.0) & (MetricaEvaluacionModel.promedio <= 4.0), 1),
-                    else_=0
-                )
-            ).label('rango_3_4'),
-            func.sum(
-                case(
-                    (MetricaEvaluacionModel.promedio > 4.0, 1),
-                    else_=0
-                )
-            ).label('rango_4_5')
-        ).select_from(
-            EstudianteModel
-        ).join(
-            UsuarioEstudianteModel,
-            EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-        ).join(
-            MetricaEvaluacionModel,
-            EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
-        ).where(
-            UsuarioEstudianteModel.usuario_id == current_user.id
+@router.get("/estadisticas/lote/", response_model=List[EstadisticasResponse])
+async def obtener_varias_estadisticas(
+    tipos: Optional[List[TipoEstadistica]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Varias estadísticas en una sola petición (todas si no se indican `tipos`)."""
+    tipos = list(dict.fromkeys(tipos)) if tipos else list(TipoEstadistica)
+    return await calcular_varias_estadisticas(db, current_user.id, tipos)
+
+@router.get("/estadisticas/cruzada/", response_model=EstadisticaCruzadaResponse)
+async def obtener_estadistica_cruzada(
+    filas: DimensionCruce,
+    columnas: DimensionCruce,
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Tabla cruzada de dos dimensiones con subtotales por fila, columna y total."""
+    if filas == columnas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Las dimensiones de filas y columnas deben ser distintas"
         )
+    return await calcular_estadistica_cruzada(db, current_user.id, filas, columnas)
 
-        result = await db.execute(query)
-        stats = result.first()
-        
-        # Calcular distribución de niveles de riesgo
-        niveles = [
-            {"rango": (0.0, 1.0), "nivel": NivelRiesgo.ALTO},
-            {"rango": (1.1, 2.9), "nivel": NivelRiesgo.MEDIO},
-            {"rango": (3.0, 5.0), "nivel": NivelRiesgo.BAJO}
-        ]
-        
-        distribucion_niveles = []
-        total = stats.total if stats.total > 0 else 1
-
-        for nivel in niveles:
-            query_nivel = select(func.count()).select_from(
-                EstudianteModel
-            ).join(
-                UsuarioEstudianteModel,
-                EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-            ).join(
-                MetricaEvaluacionModel,
-                EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
-            ).where(
-                UsuarioEstudianteModel.usuario_id == current_user.id,
-                MetricaEvaluacionModel.promedio >= nivel["rango"][0],
-                MetricaEvaluacionModel.promedio <= nivel["rango"][1]
-            )
-            
-            result_nivel = await db.execute(query_nivel)
-            cantidad = result_nivel.scalar()
-            
-            distribucion_niveles.append(
-                EstadisticaItem(
-                    etiqueta=nivel["nivel"].value,
-                    cantidad=cantidad,
-                    porcentaje=round((cantidad / total) * 100, 2)
-                )
-            )
-
-        return EstadisticasResponse(
-            tipo=tipo,
-            datos=EstadisticaPromedio(
-                promedio_general=round(stats.promedio_general, 2) if stats.promedio_general else 0.0,
-                distribucion_niveles=distribucion_niveles,
-                rango_promedios={
-                    "0-1": stats.rango_0_1,
-                    "1-2": stats.rango_1_2,
-                    "2-3": stats.rango_2_3,
-                    "3-4": stats.rango_3_4,
-                    "4-5": stats.rango_4_5
-                }
-            )
+@router.get("/estadisticas/histograma/", response_model=HistogramaPromedioResponse)
+async def obtener_histograma_promedio(
+    ancho: Optional[float] = Query(None, gt=0),
+    bordes: Optional[List[float]] = Query(None),
+    percentiles: Optional[List[float]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Histograma de promedios con intervalos de `ancho` fijo (1.0 por defecto)
+    o con `bordes` crecientes, más mediana, cuartiles y `percentiles` (0-100)."""
+    if ancho is not None and bordes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indique el ancho de los intervalos o sus bordes, no ambos"
         )
-
-    else:
-        # Para otros tipos de estadísticas (colegio, municipio, semestre)
-        group_by_column = None
-        join_model = None
-        
-        if tipo == TipoEstadistica.COLEGIO:
-            group_by_column = ColegioEgresadoModel.nombre
-            join_model = ColegioEgresadoModel
-            join_condition = (EstudianteModel.colegio_egresado_id == ColegioEgresadoModel.id)
-        elif tipo == TipoEstadistica.MUNICIPIO:
-            group_by_column = MunicipioNacimientoModel.nombre
-            join_model = MunicipioNacimientoModel
-            join_condition = (EstudianteModel.municipio_nacimiento_id == MunicipioNacimientoModel.id)
-        elif tipo == TipoEstadistica.SEMESTRE:
-            group_by_column = EstudianteModel.semestre
-        elif tipo == TipoEstadistica.NIVEL_RIESGO:
-            # Estadísticas por nivel de riesgo
-            query = select(
-                case(
-                    (MetricaEvaluacionModel.promedio <= 1.0, "ALTO"),
-                    (MetricaEvaluacionModel.promedio <= 2.9, "MEDIO"),
-                    else_="BAJO"
-                ).label('nivel'),
-                func.count().label('cantidad')
-            ).select_from(
-                EstudianteModel
-            ).join(
-                UsuarioEstudianteModel,
-                EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-            ).join(
-                MetricaEvaluacionModel,
-                EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
-            ).where(
-                UsuarioEstudianteModel.usuario_id == current_user.id
-            ).group_by('nivel')
-            
-            result = await db.execute(query)
-            stats_raw = result.all()
-            
-            total = sum(item.cantidad for item in stats_raw)
-            items = [
-                EstadisticaItem(
-                    etiqueta=item.nivel,
-                    cantidad=item.cantidad,
-                    porcentaje=round((item.cantidad / total) * 100, 2)
-                )
-                for item in stats_raw
-            ]
-            
-            return EstadisticasResponse(
-                tipo=tipo,
-                datos=EstadisticaGeneral(
-                    total_estudiantes=total,
-                    items=items
-                )
-            )
-
-        # Consulta para otros tipos de estadísticas
-        if join_model:
-            query = select(
-                group_by_column.label('grupo'),
-                func.count().label('cantidad')
-            ).select_from(
-                EstudianteModel
-            ).join(
-                UsuarioEstudianteModel,
-                EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-            ).join(
-                join_model,
-                join_condition
-            ).where(
-                UsuarioEstudianteModel.usuario_id == current_user.id
-            ).group_by(group_by_column)
-        else:
-            query = select(
-                group_by_column.label('grupo'),
-                func.count().label('cantidad')
-            ).select_from(
-                EstudianteModel
-            ).join(
-                UsuarioEstudianteModel,
-                EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
-            ).where(
-                UsuarioEstudianteModel.usuario_id == current_user.id
-            ).group_by(group_by_column)
-
-        result = await db.execute(query)
-        stats_raw = result.all()
-        
-        total = sum(item.cantidad for item in stats_raw)
-        items = [
-            EstadisticaItem(
-                etiqueta=str(item.grupo),
-                cantidad=item.cantidad,
-                porcentaje=round((item.cantidad / total) * 100, 2)
-            )
-            for item in stats_raw
-        ]
-        
-        return EstadisticasResponse(
-            tipo=tipo,
-            datos=EstadisticaGeneral(
-                total_estudiantes=total,
-                items=items
+    if bordes:
+        # NaN no es mayor ni menor que nada: se rechazan los no finitos antes
+        # de comprobar el orden
+        if (
+            len(bordes) < 2
+            or not all(math.isfinite(borde) for borde in bordes)
+            or any(siguiente <= anterior for anterior, siguiente in zip(bordes, bordes[1:]))
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Los bordes deben ser al menos dos valores finitos estrictamente crecientes"
             )
+    else:
+        try:
+            bordes = bordes_por_ancho(ancho or 1.0)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(bordes) - 1 > MAX_INTERVALOS_HISTOGRAMA:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El histograma admite como máximo {MAX_INTERVALOS_HISTOGRAMA} intervalos"
         )
+    percentiles = list(dict.fromkeys(percentiles or []))
+    if any(not 0 <= percentil <= 100 for percentil in percentiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Los percentiles deben estar entre 0 y 100"
+        )
+    return await calcular_histograma_promedio(db, current_user.id, bordes, percentiles)
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etiquetas = [etiqueta.strip() for etiqueta in if_none_match.split(",")]
+    return "*" in etiquetas or any(etiqueta.removeprefix("W/") == etag for etiqueta in etiquetas)
 
 @router.get("/diagramas/")
 async def generar_diagrama(
     tipo_estadistica: TipoEstadistica,
     tipo_diagrama: TipoDiagrama,
+    formato: FormatoDiagrama = FormatoDiagrama.PNG,
+    binario: bool = False,
+    ancho: float = Query(10, gt=0, le=30),
+    alto: float = Query(6, gt=0, le=30),
+    dpi: int = Query(100, ge=50, le=300),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
+    """Diagrama de una estadística. Con `binario` se devuelve la imagen
+    directamente (con ETag y Cache-Control); si no, en base64 dentro del JSON.
+    `ancho` y `alto` van en pulgadas.
+
+    Con formato `vega-lite` se devuelve la especificación del gráfico para
+    dibujarlo en el navegador, sin renderizar en el servidor.
+    """
     # Obtener los datos de las estadísticas
     estadisticas = await obtener_estadisticas(tipo_estadistica, db, current_user)
-    
-    # Crear figura de matplotlib
-    plt.figure(figsize=(10, 6))
-    plt.clf()  # Limpiar la figura actual
-    
-    if tipo_estadistica == TipoEstadistica.PROMEDIO:
-        datos = estadisticas.datos.rango_promedios
-        labels = list(datos.keys())
-        values = list(datos.values())
-    else:
-        items = estadisticas.datos.items
-        labels = [item.etiqueta for item in items]
-        values = [item.cantidad for item in items]
-    
-    if tipo_diagrama == TipoDiagrama.BARRAS:
-        plt.bar(labels, values)
-        plt.xticks(rotation=45)
-        plt.ylabel('Cantidad')
-    elif tipo_diagrama == TipoDiagrama.TORTA:
-        plt.pie(values, labels=labels, autopct='%1.1f%%')
-    elif tipo_diagrama == TipoDiagrama.LINEAS:
-        plt.plot(labels, values, marker='o')
-        plt.xticks(rotation=45)
-        plt.ylabel('Cantidad')
-    
-    plt.title(f'Estadísticas por {tipo_estadistica}')
-    
-    # Guardar el gráfico en un buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    
+    labels, values = datos_grafico(estadisticas)
+
+    titulo = titulo_grafico(tipo_estadistica)
+    if formato == FormatoDiagrama.VEGA_LITE:
+        return {
+            "tipo_estadistica": tipo_estadistica,
+            "tipo_diagrama": tipo_diagrama,
+            "especificacion": especificacion_vega_lite(labels, values, tipo_diagrama.value, titulo)
+        }
+
+    argumentos = (
+        labels, values, tipo_diagrama.value, titulo, formato.value, (ancho, alto), dpi
+    )
+    tipo_contenido = TIPOS_CONTENIDO_GRAFICO[formato.value]
+
+    if binario:
+        # El ETag es el hash del contenido: si el cliente ya tiene la imagen
+        # no hace falta ni buscarla en la caché
+        etag = f'"{clave_grafico(*argumentos)}"'
+        encabezados = {
+            "ETag": etag,
+            "Cache-Control": CACHE_GRAFICOS_CONTROL,
+            "Vary": "Authorization",
+        }
+        if _etag_coincide(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=encabezados)
+
+    # Desde la caché de imágenes o renderizado en el pool de procesos
+    imagen = await obtener_grafico(*argumentos)
+
+    if binario:
+        return Response(content=imagen, media_type=tipo_contenido, headers=encabezados)
+
     # Codificar la imagen en base64
-    imagen_base64 = base64.b64encode(buf.getvalue()).decode()
+    imagen_base64 = base64.b64encode(imagen).decode()
     
     return {
         "tipo_estadistica": tipo_estadistica,
         "tipo_diagrama": tipo_diagrama,
+        "tipo_contenido": tipo_contenido,
         "imagen_base64": imagen_base64
-    } 
\ No newline at end of file
+    }
+
+@router.get("/tablero/")
+async def generar_tablero(
+    tipos: Optional[List[TipoEstadistica]] = Query(None),
+    tipo_diagrama: TipoDiagrama = TipoDiagrama.BARRAS,
+    formato: FormatoDiagrama = FormatoDiagrama.PNG,
+    streaming: bool = False,
+    ancho: float = Query(10, gt=0, le=30),
+    alto: float = Query(6, gt=0, le=30),
+    dpi: int = Query(100, ge=50, le=300),
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Estadísticas y diagramas del tablero (todos los tipos si no se indican
+    `tipos`) en una sola petición.
+
+    Las estadísticas se leen juntas y los diagramas se renderizan a la vez.
+    Con `streaming` la respuesta es NDJSON: una línea por diagrama, en el
+    orden en que terminan.
+    """
+    tipos = list(dict.fromkeys(tipos)) if tipos else list(TipoEstadistica)
+    estadisticas = await calcular_varias_estadisticas(db, current_user.id, tipos)
+    diagramas = diagramas_tablero(estadisticas, tipo_diagrama.value, formato.value, (ancho, alto), dpi)
+
+    if streaming:
+        async def lineas():
+            async for diagrama in diagramas:
+                yield json.dumps(jsonable_encoder(diagrama), ensure_ascii=False) + "\n"
+        return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+    # Respuesta completa, en el orden de `tipos`
+    por_tipo = {diagrama["tipo_estadistica"]: diagrama async for diagrama in diagramas}
+    return {
+        "tipo_diagrama": tipo_diagrama,
+        "formato": formato,
+        "diagramas": [por_tipo[tipo] for tipo in tipos]
+    }
+
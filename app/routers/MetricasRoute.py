@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.auth.authUtils import get_current_user
+from app.models.UsuarioModel import UsuarioModel
+from app.core.ejecutores import metricas_ejecutores
+from app.core.cache import metricas_caches
+from app.services.estadisticasService import reconstruir_resumen
+
+router = APIRouter(prefix="/metricas", tags=["métricas"])
+
+@router.get("/ejecutores")
+async def obtener_metricas_ejecutores(
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Profundidad de cola y tiempos de las tareas de los pools de hilos y procesos."""
+    return metricas_ejecutores()
+
+@router.get("/cache")
+async def obtener_metricas_cache(
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Aciertos, fallos y ocupación de las cachés en memoria."""
+    return metricas_caches()
+
+@router.post("/resumen/reconstruir")
+async def reconstruir_resumen_estadisticas(
+    db: AsyncSession = Depends(get_db),
+    current_user: UsuarioModel = Depends(get_current_user)
+):
+    """Recalcula el resumen de estadísticas desde las tablas de estudiantes
+    (mantenimiento: corrige cualquier desviación acumulada)."""
+    await reconstruir_resumen(db)
+    await db.commit()
+    return {"message": "Resumen de estadísticas reconstruido"}
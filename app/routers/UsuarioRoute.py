@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.config.database import get_db
 from app.models.UsuarioModel import UsuarioModel
 from app.schemas.usuario import UsuarioCreate, Usuario, UsuarioUpdate
 from sqlalchemy import select, update, delete
 from passlib.context import CryptContext
 from app.auth.authUtils import get_current_user
+from app.core.ejecutores import ejecutar_en_hilo
+from app.core.paginacion import aplicar_cursor, separar_pagina, ENCABEZADO_CURSOR, LIMITE_MAXIMO_PAGINA
 
 router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -17,7 +19,7 @@ async def create_usuario(
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
-    hashed_password = pwd_context.hash(usuario.contraseña)
+    hashed_password = await ejecutar_en_hilo(pwd_context.hash, usuario.contraseña)
     db_usuario = UsuarioModel(
         nombres=usuario.nombres,
         apellido=usuario.apellido,
@@ -33,14 +35,23 @@ async def create_usuario(
 
 @router.get("/", response_model=List[Usuario])
 async def read_usuarios(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: UsuarioModel = Depends(get_current_user)
 ):
-    query = select(UsuarioModel).offset(skip).limit(limit)
+    """Usuarios ordenados por id; el cursor de la página siguiente va en el
+    encabezado X-Next-Cursor."""
+    try:
+        query = aplicar_cursor(select(UsuarioModel), [UsuarioModel.id], cursor, limit, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     result = await db.execute(query)
-    usuarios = result.scalars().all()
+    usuarios, next_cursor = separar_pagina(result.scalars().all(), limit, lambda u: [u.id])
+    if next_cursor:
+        response.headers[ENCABEZADO_CURSOR] = next_cursor
     return usuarios
 
 @router.get("/{usuario_id}", response_model=Usuario)
@@ -72,7 +83,7 @@ async def update_usuario(
 
     update_data = usuario.dict(exclude_unset=True)
     if "contraseña" in update_data:
-        update_data["contraseña"] = pwd_context.hash(update_data["contraseña"])
+        update_data["contraseña"] = await ejecutar_en_hilo(pwd_context.hash, update_data["contraseña"])
 
     # Asegurarse de que el rol siempre sea admin
     if "rol" in update_data:
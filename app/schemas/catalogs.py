@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 # Schemas base para catálogos
 class CatalogBase(BaseModel):
@@ -17,6 +17,15 @@ class Catalog(CatalogBase):
     class Config:
         from_attributes = True
 
+# Carga masiva: crea los nombres que no existen y devuelve todos los pedidos
+class CatalogBulkCreate(BaseModel):
+    nombres: List[str] = Field(..., min_length=1)
+
+class CatalogBulkResult(BaseModel):
+    creados: int
+    existentes: int
+    items: List[Catalog]
+
 # Tipos de documento
 class TipoDocumentoCreate(CatalogCreate):
     pass
@@ -14,6 +14,40 @@ class TipoEstadistica(str, Enum):
     NIVEL_RIESGO = "nivel_riesgo"
     SEMESTRE = "semestre"
 
+class DimensionCruce(str, Enum):
+    SEMESTRE = "semestre"
+    COLEGIO = "colegio"
+    MUNICIPIO = "municipio"
+    ESTADO_MATRICULA = "estado_matricula"
+    NIVEL_RIESGO = "nivel_riesgo"
+
+class ModoTotal(str, Enum):
+    EXACTO = "exacto"
+    ESTIMADO = "estimado"
+    OMITIR = "omitir"
+
+class OrdenEstudiantes(str, Enum):
+    ID = "id"
+    CODIGO = "codigo"
+    NOMBRE = "nombre"
+    SEMESTRE = "semestre"
+    PROMEDIO = "promedio"
+
+class DireccionOrden(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+class TipoDiagrama(str, Enum):
+    BARRAS = "barras"
+    TORTA = "torta"
+    LINEAS = "lineas"
+
+class FormatoDiagrama(str, Enum):
+    PNG = "png"
+    SVG = "svg"
+    WEBP = "webp"
+    VEGA_LITE = "vega-lite"
+
 class EstudianteBase(BaseModel):
     codigo: str
     nombre: str
@@ -66,7 +100,8 @@ class EstudianteConRiesgo(BaseModel):
 
 class ListaEstudiantesResponse(BaseModel):
     estudiantes: List[EstudianteConRiesgo]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class EstadisticaItem(BaseModel):
     etiqueta: str
@@ -84,4 +119,29 @@ class EstadisticaGeneral(BaseModel):
 
 class EstadisticasResponse(BaseModel):
     tipo: TipoEstadistica
-    datos: EstadisticaPromedio | EstadisticaGeneral 
\ No newline at end of file
+    datos: EstadisticaPromedio | EstadisticaGeneral 
+
+class CeldaCruce(BaseModel):
+    fila: str
+    columna: str
+    cantidad: int
+
+class EstadisticaCruzadaResponse(BaseModel):
+    filas: DimensionCruce
+    columnas: DimensionCruce
+    celdas: List[CeldaCruce]
+    totales_fila: Dict[str, int]
+    totales_columna: Dict[str, int]
+    total: int
+
+class IntervaloHistograma(BaseModel):
+    minimo: float
+    maximo: float
+    cantidad: int
+
+class HistogramaPromedioResponse(BaseModel):
+    total_estudiantes: int
+    intervalos: List[IntervaloHistograma]
+    mediana: Optional[float] = None
+    cuartiles: Dict[str, Optional[float]]  # {"q1": ..., "q2": ..., "q3": ...}
+    percentiles: Dict[str, Optional[float]]  # Ejemplo: {"p10": 1.2, "p90": 4.1}
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List
+from enum import Enum
+
+class EstadoTrabajo(str, Enum):
+    PENDIENTE = "pendiente"
+    EN_PROCESO = "en_proceso"
+    COMPLETADO = "completado"
+    FALLIDO = "fallido"
+    CANCELADO = "cancelado"
+
+class TrabajoImportacion(BaseModel):
+    id: str
+    archivo: str
+    estado: EstadoTrabajo
+    filas_procesadas: int
+    estudiantes_creados: int
+    estudiantes_actualizados: int
+    estudiantes_sin_cambios: int
+    filas_fallidas: int
+    catalogos_creados: int
+    errores: List[str]
+    mensaje: Optional[str] = None
+    creado: datetime
+    finalizado: Optional[datetime] = None
@@ -0,0 +1,73 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, and_, or_, literal, literal_column, table, column
+from app.models.EstudianteModel import EstudianteModel
+from app.services.estadisticasService import estudiantes_del_usuario
+
+# Longitud mínima del término para la búsqueda por trigramas; con menos
+# caracteres solo se busca por prefijo
+LONGITUD_MINIMA_TRIGRAMAS = 3
+# Tabla FTS5 de la búsqueda en SQLite (ver app.models._crear_indice_busqueda)
+_busqueda_fts = table("estudiante_busqueda", column("rowid"), column("rank"))
+# Mayor carácter posible: cota superior de un rango de prefijo
+_FIN_PREFIJO = "\U0010ffff"
+
+def _escapar_like(termino: str) -> str:
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _prefijo_sql(columna, termino: str, postgresql: bool):
+    """Condición de prefijo que puede resolver un índice b-tree."""
+    if postgresql:
+        # Índice con text_pattern_ops
+        return columna.like(_escapar_like(termino) + "%", escape="\\")
+    # SQLite no usa índices con LIKE (no distingue mayúsculas): rango equivalente
+    return and_(columna >= termino, columna < termino + _FIN_PREFIJO)
+
+def _consulta_fts5(termino: str):
+    """Expresión MATCH de FTS5: los trigramas del término unidos con OR, de
+    modo que un nombre con errores de tipeo aún coincide en parte; bm25
+    ordena primero los que comparten más trigramas."""
+    termino = termino.lower()
+    trigramas = dict.fromkeys(termino[i:i + 3] for i in range(len(termino) - 2))
+    return "nombre : (" + " OR ".join('"' + trigrama.replace('"', '""') + '"' for trigrama in trigramas) + ")"
+
+async def buscar_estudiantes(db: AsyncSession, usuario_id: int, termino: str, limit: int) -> list:
+    """Estudiantes del usuario por nombre (prefijo o aproximado), código o
+    documento (exacto o prefijo), ordenados por relevancia.
+
+    Coincidencias exactas de código o documento primero; luego prefijos de
+    código, documento o nombre; luego parecido del nombre (word_similarity de
+    pg_trgm en PostgreSQL, bm25 sobre trigramas FTS5 en SQLite).
+    """
+    termino = termino.strip()
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    exacto = or_(EstudianteModel.codigo == termino, EstudianteModel.documento == termino)
+    prefijo = or_(
+        _prefijo_sql(EstudianteModel.codigo, termino, postgresql),
+        _prefijo_sql(EstudianteModel.documento, termino, postgresql),
+        # Sin distinguir mayúsculas; en PostgreSQL lo resuelve el índice de trigramas
+        EstudianteModel.nombre.ilike(_escapar_like(termino) + "%", escape="\\")
+    )
+    query = estudiantes_del_usuario(select(EstudianteModel), usuario_id)
+    orden = [case((exacto, 0), (prefijo, 1), else_=2)]
+
+    if len(termino) < LONGITUD_MINIMA_TRIGRAMAS:
+        query = query.where(prefijo)
+    elif postgresql:
+        # `<%`: word_similarity sobre el umbral de pg_trgm, resuelto con el índice GIN
+        parecido = literal(termino).op("<%")(EstudianteModel.nombre)
+        query = query.where(or_(prefijo, parecido))
+        orden.append(func.word_similarity(termino, EstudianteModel.nombre).desc())
+    else:
+        coincidencias = select(
+            _busqueda_fts.c.rowid.label('estudiante_id'),
+            _busqueda_fts.c.rank.label('relevancia')
+        ).where(
+            literal_column("estudiante_busqueda").op("MATCH")(_consulta_fts5(termino))
+        ).subquery()
+        query = query.outerjoin(
+            coincidencias, coincidencias.c.estudiante_id == EstudianteModel.id
+        ).where(or_(prefijo, coincidencias.c.estudiante_id.is_not(None)))
+        orden.append(coincidencias.c.relevancia)
+
+    result = await db.execute(query.order_by(*orden, EstudianteModel.id).limit(limit))
+    return result.scalars().all()
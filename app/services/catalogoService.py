@@ -0,0 +1,39 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db.database import dialect_insert
+
+# Nombres por sentencia: mantiene los parámetros por debajo del límite del driver
+TAMANO_LOTE_CATALOGO = 1000
+
+def normalizar_nombres(nombres) -> list:
+    """Quita espacios, vacíos y duplicados conservando el orden."""
+    vistos = {}
+    for nombre in nombres:
+        nombre = nombre.strip()
+        if nombre:
+            vistos.setdefault(nombre, None)
+    return list(vistos)
+
+async def insertar_faltantes(db: AsyncSession, model_class, nombres):
+    """Inserta en el catálogo los nombres que no existen, con una sentencia
+    INSERT ... ON CONFLICT (nombre) DO NOTHING por lote.
+
+    Devuelve el diccionario nombre -> id de todos los nombres pedidos y la
+    cantidad de ítems creados. No confirma la transacción.
+    """
+    nombres = normalizar_nombres(nombres)
+    ids = {}
+    creados = 0
+    for inicio in range(0, len(nombres), TAMANO_LOTE_CATALOGO):
+        lote = nombres[inicio:inicio + TAMANO_LOTE_CATALOGO]
+        stmt = dialect_insert(db, model_class).values([{'nombre': nombre} for nombre in lote])
+        stmt = stmt.on_conflict_do_nothing(index_elements=['nombre'])
+        result = await db.execute(stmt.returning(model_class.id))
+        creados += len(result.all())
+
+        # Los que ya existían no vuelven en RETURNING
+        result = await db.execute(
+            select(model_class.nombre, model_class.id).where(model_class.nombre.in_(lote))
+        )
+        ids.update(result.all())
+    return ids, creados
@@ -0,0 +1,140 @@
+from app.core.cache import CacheLRU, CacheDisco
+from app.core.config import CACHE_GRAFICOS_TAMANO, CACHE_GRAFICOS_DIRECTORIO, CACHE_GRAFICOS_DISCO_MAX
+from app.core.ejecutores import ejecutar_en_hilo, ejecutar_en_proceso
+from app.services.graficosService import (
+    renderizar_grafico, FORMATO_GRAFICO, TAMANO_GRAFICO, DPI_GRAFICO, TIPOS_CONTENIDO_GRAFICO
+)
+from app.schemas.estudiante import TipoEstadistica, EstadisticasResponse
+import asyncio
+import base64
+import hashlib
+import json
+
+# Imágenes renderizadas, con clave el hash de su contenido: dos peticiones con
+# los mismos datos, tipo, formato, tamaño y resolución reciben la misma imagen sin pasar
+# por matplotlib, sean o no del mismo usuario. No necesitan invalidarse: si
+# cambian las estadísticas, cambia la clave.
+cache_graficos = CacheLRU("graficos", CACHE_GRAFICOS_TAMANO)
+# Copia en disco opcional: sobrevive a reinicios y los workers que usan el
+# mismo directorio leen lo que guardaron los demás (el límite de archivos se
+# aplica por worker; ver CacheDisco)
+cache_graficos_disco = (
+    CacheDisco("graficos_disco", CACHE_GRAFICOS_DIRECTORIO, CACHE_GRAFICOS_DISCO_MAX)
+    if CACHE_GRAFICOS_DIRECTORIO else None
+)
+
+def datos_grafico(estadisticas: EstadisticasResponse):
+    """Etiquetas y valores a graficar de una estadística."""
+    if estadisticas.tipo == TipoEstadistica.PROMEDIO:
+        datos = estadisticas.datos.rango_promedios
+        return list(datos.keys()), list(datos.values())
+    items = estadisticas.datos.items
+    return [item.etiqueta for item in items], [item.cantidad for item in items]
+
+def titulo_grafico(tipo_estadistica: TipoEstadistica) -> str:
+    return f'Estadísticas por {tipo_estadistica.value}'
+
+# Especificación declarativa (la dibuja el navegador, sin matplotlib)
+
+ESQUEMA_VEGA_LITE = "https://vega.github.io/schema/vega-lite/v5.json"
+
+def especificacion_vega_lite(labels, values, tipo_diagrama: str, titulo: str) -> dict:
+    """Especificación Vega-Lite equivalente a `renderizar_grafico`."""
+    especificacion = {
+        "$schema": ESQUEMA_VEGA_LITE,
+        "title": titulo,
+        "data": {"values": [
+            {"etiqueta": etiqueta, "cantidad": cantidad}
+            for etiqueta, cantidad in zip(labels, values)
+        ]},
+    }
+    if tipo_diagrama == "torta":
+        especificacion["mark"] = {"type": "arc", "tooltip": True}
+        especificacion["encoding"] = {
+            "theta": {"field": "cantidad", "type": "quantitative"},
+            "color": {"field": "etiqueta", "type": "nominal", "sort": None},
+        }
+        return especificacion
+
+    especificacion["mark"] = (
+        {"type": "line", "point": True, "tooltip": True} if tipo_diagrama == "lineas"
+        else {"type": "bar", "tooltip": True}
+    )
+    especificacion["encoding"] = {
+        # sort None conserva el orden de los datos, como en matplotlib
+        "x": {"field": "etiqueta", "type": "nominal", "sort": None, "title": None,
+              "axis": {"labelAngle": -45}},
+        "y": {"field": "cantidad", "type": "quantitative", "title": "Cantidad"},
+    }
+    return especificacion
+
+def clave_grafico(
+    labels, values, tipo_diagrama: str, titulo: str,
+    formato: str = FORMATO_GRAFICO, tamano=TAMANO_GRAFICO, dpi: int = DPI_GRAFICO
+) -> str:
+    """Hash del contenido del diagrama; sirve también como ETag."""
+    contenido = json.dumps(
+        [list(labels), list(values), tipo_diagrama, titulo, formato, list(tamano), dpi],
+        ensure_ascii=False
+    )
+    return hashlib.blake2b(contenido.encode(), digest_size=20).hexdigest()
+
+async def obtener_grafico(
+    labels, values, tipo_diagrama: str, titulo: str,
+    formato: str = FORMATO_GRAFICO, tamano=TAMANO_GRAFICO, dpi: int = DPI_GRAFICO
+) -> bytes:
+    """Imagen del diagrama desde la caché (memoria y luego disco) o, si no
+    está, renderizada en el pool de procesos y guardada en ambas."""
+    clave = clave_grafico(labels, values, tipo_diagrama, titulo, formato, tamano, dpi)
+    imagen = cache_graficos.obtener(clave)
+    if imagen is not None:
+        return imagen
+
+    if cache_graficos_disco is not None:
+        imagen = await ejecutar_en_hilo(cache_graficos_disco.obtener, clave)
+        if imagen is not None:
+            cache_graficos.guardar(clave, imagen)
+            return imagen
+
+    # Renderizar en el pool de procesos para no bloquear el event loop
+    imagen = await ejecutar_en_proceso(
+        renderizar_grafico, labels, values, tipo_diagrama, titulo, formato, tamano, dpi
+    )
+    cache_graficos.guardar(clave, imagen)
+    if cache_graficos_disco is not None:
+        await ejecutar_en_hilo(cache_graficos_disco.guardar, clave, imagen)
+    return imagen
+
+# Tablero: varias estadísticas con su diagrama
+
+async def diagrama_tablero(
+    estadisticas: EstadisticasResponse, tipo_diagrama: str, formato: str,
+    tamano=TAMANO_GRAFICO, dpi: int = DPI_GRAFICO
+) -> dict:
+    """Estadística y su diagrama (imagen en base64 o especificación Vega-Lite)."""
+    labels, values = datos_grafico(estadisticas)
+    titulo = titulo_grafico(estadisticas.tipo)
+    diagrama = {"tipo_estadistica": estadisticas.tipo, "datos": estadisticas.datos}
+    if formato == "vega-lite":
+        diagrama["especificacion"] = especificacion_vega_lite(labels, values, tipo_diagrama, titulo)
+    else:
+        imagen = await obtener_grafico(labels, values, tipo_diagrama, titulo, formato, tamano, dpi)
+        diagrama["tipo_contenido"] = TIPOS_CONTENIDO_GRAFICO[formato]
+        diagrama["imagen_base64"] = base64.b64encode(imagen).decode()
+    return diagrama
+
+async def diagramas_tablero(estadisticas, tipo_diagrama: str, formato: str, tamano=TAMANO_GRAFICO, dpi: int = DPI_GRAFICO):
+    """Genera los diagramas de todas las estadísticas a medida que terminan.
+
+    Se renderizan a la vez en el pool de procesos: el tiempo total es el del
+    más lento, no la suma. Un diagrama que falla se informa con `error` sin
+    detener los demás.
+    """
+    async def generar(estadistica):
+        try:
+            return await diagrama_tablero(estadistica, tipo_diagrama, formato, tamano, dpi)
+        except Exception as e:
+            return {"tipo_estadistica": estadistica.tipo, "datos": estadistica.datos, "error": str(e)}
+
+    for tarea in asyncio.as_completed([generar(estadistica) for estadistica in estadisticas]):
+        yield await tarea
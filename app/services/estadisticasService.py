@@ -0,0 +1,628 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from sqlalchemy import select, update, delete, func, case, cast, literal, literal_column, union_all, tuple_, Float, String, event
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import array
+import math
+from app.core.cache import CacheLRU
+from app.core.config import (
+    CACHE_ESTADISTICAS_TAMANO, CACHE_ESTADISTICAS_TTL, RIESGO_ALTO_MAX, RIESGO_MEDIO_MAX
+)
+from app.db.database import dialect_insert
+from app.models.EstudianteModel import EstudianteModel
+from app.models.MetricaEvaluacionModel import MetricaEvaluacionModel
+from app.models.UsuarioEstudianteModel import UsuarioEstudianteModel
+from app.models.ColegioEgresadoModel import ColegioEgresadoModel
+from app.models.MunicipioNacimientoModel import MunicipioNacimientoModel
+from app.models.EstadoMatriculaModel import EstadoMatriculaModel
+from app.models.EstadisticaResumenModel import EstadisticaResumenModel
+from app.schemas.estudiante import (
+    NivelRiesgo, TipoEstadistica, EstadisticasResponse,
+    EstadisticaPromedio, EstadisticaGeneral, EstadisticaItem,
+    DimensionCruce, CeldaCruce, EstadisticaCruzadaResponse,
+    IntervaloHistograma, HistogramaPromedioResponse
+)
+
+# Rangos del histograma de promedios: etiqueta y límites (inferior exclusivo,
+# superior inclusivo); None deja el rango abierto
+RANGOS_PROMEDIO = [
+    ("0-1", None, 1.0),
+    ("1-2", 1.0, 2.0),
+    ("2-3", 2.0, 3.0),
+    ("3-4", 3.0, 4.0),
+    ("4-5", 4.0, None),
+]
+
+# Escala de calificaciones: límites por defecto del histograma configurable
+ESCALA_PROMEDIO = (0.0, 5.0)
+# Máximo de intervalos que se aceptan en el histograma configurable
+MAX_INTERVALOS_HISTOGRAMA = 200
+
+# Dimensión del resumen para el histograma de promedios; las demás usan el
+# valor de TipoEstadistica
+DIMENSION_RANGO = "rango_promedio"
+
+# Dimensiones que guardan el id del catálogo; el nombre se resuelve al leer
+CATALOGOS_DIMENSION = {
+    TipoEstadistica.COLEGIO: ColegioEgresadoModel,
+    TipoEstadistica.MUNICIPIO: MunicipioNacimientoModel,
+}
+
+# Estadísticas calculadas, con clave (usuario_id, tipo, versión de datos del
+# usuario). La versión se incrementa al confirmar una transacción que modificó
+# estudiantes del usuario, así que las entradas viejas no vuelven a leerse. En
+# despliegues con varios workers el TTL acota cuánto puede durar un dato viejo
+# en los demás procesos.
+cache_estadisticas = CacheLRU("estadisticas", CACHE_ESTADISTICAS_TAMANO, CACHE_ESTADISTICAS_TTL)
+_versiones = {}
+
+def version_datos(usuario_id: int) -> int:
+    return _versiones.get(usuario_id, 0)
+
+def marcar_usuarios_modificados(db: AsyncSession, usuario_ids):
+    """Registra en la sesión los usuarios cuyas estadísticas cambian; su
+    versión se incrementa cuando la transacción se confirma."""
+    db.info.setdefault('usuarios_modificados', set()).update(usuario_ids)
+
+@event.listens_for(Session, "after_commit")
+def _incrementar_versiones(session):
+    usuarios = session.info.pop('usuarios_modificados', None)
+    if not usuarios:
+        return
+    for usuario_id in usuarios:
+        _versiones[usuario_id] = version_datos(usuario_id) + 1
+    cache_estadisticas.invalidar(lambda clave: clave[0] in usuarios)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_modificados(session):
+    session.info.pop('usuarios_modificados', None)
+
+def calcular_nivel_riesgo(promedio: float) -> NivelRiesgo:
+    if promedio <= RIESGO_ALTO_MAX:
+        return NivelRiesgo.ALTO
+    elif promedio <= RIESGO_MEDIO_MAX:
+        return NivelRiesgo.MEDIO
+    else:
+        return NivelRiesgo.BAJO
+
+def nivel_riesgo_sql(promedio):
+    """Expresión SQL equivalente a `calcular_nivel_riesgo`."""
+    return case(
+        (promedio <= RIESGO_ALTO_MAX, NivelRiesgo.ALTO.value),
+        (promedio <= RIESGO_MEDIO_MAX, NivelRiesgo.MEDIO.value),
+        else_=NivelRiesgo.BAJO.value
+    )
+
+async def recalcular_niveles_riesgo(db: AsyncSession) -> int:
+    """Actualiza en bloque el nivel de riesgo guardado que no coincide con los
+    umbrales actuales (umbrales cambiados o filas anteriores a la columna).
+
+    Devuelve las métricas actualizadas; el resumen de estadísticas debe
+    reconstruirse después si hubo cambios.
+    """
+    nivel_riesgo = nivel_riesgo_sql(MetricaEvaluacionModel.promedio)
+    result = await db.execute(
+        update(MetricaEvaluacionModel).where(
+            MetricaEvaluacionModel.nivel_riesgo.is_distinct_from(nivel_riesgo)
+        ).values(nivel_riesgo=nivel_riesgo).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def _condicion_rango(promedio, minimo, maximo):
+    condiciones = []
+    if minimo is not None:
+        condiciones.append(promedio > minimo)
+    if maximo is not None:
+        condiciones.append(promedio <= maximo)
+    return condiciones[0] if len(condiciones) == 1 else condiciones[0] & condiciones[1]
+
+def rango_promedio_sql(promedio):
+    """Etiqueta del rango de RANGOS_PROMEDIO al que pertenece el promedio."""
+    return case(*(
+        (_condicion_rango(promedio, minimo, maximo), etiqueta)
+        for etiqueta, minimo, maximo in RANGOS_PROMEDIO
+    ))
+
+def estudiantes_del_usuario(query, usuario_id: int):
+    """Restringe una consulta sobre estudiantes a los del usuario."""
+    return query.join(
+        UsuarioEstudianteModel,
+        EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
+    ).where(
+        UsuarioEstudianteModel.usuario_id == usuario_id
+    )
+
+def _porcentaje(cantidad: int, total: int) -> float:
+    return round((cantidad / total) * 100, 2) if total else 0.0
+
+# Mantenimiento del resumen
+
+def _consulta_aportes(estudiante_ids=None):
+    """Aporte de los estudiantes (todos, o los de `estudiante_ids`: lista o
+    subconsulta de ids) a cada (usuario, dimensión, grupo) del resumen."""
+    promedio = MetricaEvaluacionModel.promedio
+    dimensiones = [
+        (TipoEstadistica.SEMESTRE.value, EstudianteModel.semestre, False),
+        (TipoEstadistica.COLEGIO.value, cast(EstudianteModel.colegio_egresado_id, String), False),
+        (TipoEstadistica.MUNICIPIO.value, cast(EstudianteModel.municipio_nacimiento_id, String), False),
+        # Las dimensiones por promedio solo cuentan estudiantes con métrica
+        (TipoEstadistica.NIVEL_RIESGO.value, MetricaEvaluacionModel.nivel_riesgo, True),
+        (DIMENSION_RANGO, rango_promedio_sql(promedio), True),
+    ]
+
+    consultas = []
+    for dimension, grupo, requiere_metrica in dimensiones:
+        # Se agrupa por el nombre de la columna de salida: repetida en el
+        # GROUP BY, PostgreSQL no reconocería un CASE con parámetros como la
+        # misma expresión del SELECT (ninguna tabla de la consulta tiene una
+        # columna "grupo" que lo haga ambiguo)
+        query = select(
+            UsuarioEstudianteModel.usuario_id,
+            literal(dimension).label('dimension'),
+            grupo.label('grupo'),
+            func.count().label('cantidad'),
+            func.coalesce(func.sum(promedio), 0.0).label('suma_promedio')
+        ).select_from(
+            EstudianteModel
+        ).join(
+            UsuarioEstudianteModel,
+            EstudianteModel.id == UsuarioEstudianteModel.estudiante_id
+        ).outerjoin(
+            MetricaEvaluacionModel,
+            EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
+        ).group_by(
+            UsuarioEstudianteModel.usuario_id, literal_column('grupo')
+        )
+        if requiere_metrica:
+            query = query.where(promedio.is_not(None))
+        if estudiante_ids is not None:
+            query = query.where(EstudianteModel.id.in_(estudiante_ids))
+        consultas.append(query)
+    return union_all(*consultas)
+
+# Clave del bloqueo asesor de PostgreSQL que serializa la reconstrucción del
+# resumen con los ajustes incrementales (y con otras reconstrucciones)
+BLOQUEO_RESUMEN = 7310402
+
+async def _bloquear_resumen(db: AsyncSession, exclusivo: bool):
+    """Bloqueo hasta el fin de la transacción: compartido para los ajustes,
+    exclusivo para la reconstrucción. En SQLite basta el bloqueo de escritura
+    de la propia base."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    bloqueo = func.pg_advisory_xact_lock if exclusivo else func.pg_advisory_xact_lock_shared
+    await db.execute(select(bloqueo(BLOQUEO_RESUMEN)))
+
+async def _leer_aportes(db: AsyncSession, estudiante_ids, signo: int = 1) -> list:
+    result = await db.execute(_consulta_aportes(estudiante_ids))
+    return [
+        {
+            'usuario_id': row.usuario_id,
+            'dimension': row.dimension,
+            'grupo': row.grupo,
+            'cantidad': signo * row.cantidad,
+            'suma_promedio': signo * row.suma_promedio
+        }
+        for row in result.all()
+    ]
+
+async def ajustar_resumen(db: AsyncSession, estudiante_ids, signo: int):
+    """Suma (signo=1) o resta (signo=-1) el aporte actual de los estudiantes
+    al resumen de todos sus usuarios.
+
+    Para reflejar un cambio se resta antes de escribir y se suma después,
+    dentro de la misma transacción. No confirma la transacción.
+    """
+    if isinstance(estudiante_ids, (list, set, tuple)):
+        if not estudiante_ids:
+            return
+        estudiante_ids = list(estudiante_ids)
+
+    await _bloquear_resumen(db, exclusivo=False)
+    if signo < 0 and estudiante_ids is not None:
+        # El bloqueo asesor es compartido entre escritores: se bloquean además
+        # las filas de los estudiantes (en orden de id) hasta el fin de la
+        # transacción, para que otra escritura sobre los mismos estudiantes
+        # espere y reste su aporte ya actualizado, no el mismo aporte viejo
+        await db.execute(
+            select(EstudianteModel.id)
+            .where(EstudianteModel.id.in_(estudiante_ids))
+            .order_by(EstudianteModel.id)
+            .with_for_update()
+        )
+    aportes = await _leer_aportes(db, estudiante_ids, signo)
+    if not aportes:
+        return
+    marcar_usuarios_modificados(db, {aporte['usuario_id'] for aporte in aportes})
+
+    stmt = dialect_insert(db, EstadisticaResumenModel).values(aportes)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['usuario_id', 'dimension', 'grupo'],
+        set_={
+            'cantidad': EstadisticaResumenModel.cantidad + stmt.excluded.cantidad,
+            'suma_promedio': EstadisticaResumenModel.suma_promedio + stmt.excluded.suma_promedio
+        }
+    )
+    await db.execute(stmt)
+
+    if signo < 0:
+        # Quitar los grupos que quedaron vacíos
+        await db.execute(
+            delete(EstadisticaResumenModel).where(
+                EstadisticaResumenModel.usuario_id.in_({aporte['usuario_id'] for aporte in aportes}),
+                EstadisticaResumenModel.cantidad <= 0
+            )
+        )
+
+async def resumen_vacio(db: AsyncSession) -> bool:
+    result = await db.execute(select(EstadisticaResumenModel.id).limit(1))
+    return result.first() is None
+
+async def reconstruir_resumen(db: AsyncSession):
+    """Recalcula el resumen completo desde las tablas de estudiantes.
+
+    Escribe valores absolutos con el bloqueo exclusivo tomado: dos
+    reconstrucciones simultáneas (p. ej. varios workers arrancando) o una
+    importación en curso no pueden sumar dos veces ni perder su aporte.
+    No confirma la transacción.
+    """
+    await _bloquear_resumen(db, exclusivo=True)
+    await db.execute(delete(EstadisticaResumenModel))
+    aportes = await _leer_aportes(db, None)
+    if not aportes:
+        return
+    marcar_usuarios_modificados(db, {aporte['usuario_id'] for aporte in aportes})
+
+    stmt = dialect_insert(db, EstadisticaResumenModel).values(aportes)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['usuario_id', 'dimension', 'grupo'],
+        set_={
+            'cantidad': stmt.excluded.cantidad,
+            'suma_promedio': stmt.excluded.suma_promedio
+        }
+    )
+    await db.execute(stmt)
+
+# Lectura de estadísticas desde el resumen
+
+# Dimensiones del resumen que necesita cada tipo de estadística
+DIMENSIONES_ESTADISTICA = {
+    TipoEstadistica.PROMEDIO: [TipoEstadistica.NIVEL_RIESGO.value, DIMENSION_RANGO],
+    TipoEstadistica.COLEGIO: [TipoEstadistica.COLEGIO.value],
+    TipoEstadistica.MUNICIPIO: [TipoEstadistica.MUNICIPIO.value],
+    TipoEstadistica.NIVEL_RIESGO: [TipoEstadistica.NIVEL_RIESGO.value],
+    TipoEstadistica.SEMESTRE: [TipoEstadistica.SEMESTRE.value],
+}
+
+async def _leer_resumen(db: AsyncSession, usuario_id: int, dimensiones) -> dict:
+    """Grupos del usuario en las dimensiones pedidas, en una sola consulta."""
+    result = await db.execute(
+        select(
+            EstadisticaResumenModel.dimension,
+            EstadisticaResumenModel.grupo,
+            EstadisticaResumenModel.cantidad,
+            EstadisticaResumenModel.suma_promedio
+        ).where(
+            EstadisticaResumenModel.usuario_id == usuario_id,
+            EstadisticaResumenModel.dimension.in_(list(dimensiones)),
+            EstadisticaResumenModel.cantidad > 0
+        ).order_by(EstadisticaResumenModel.grupo)
+    )
+    grupos = {dimension: [] for dimension in dimensiones}
+    for row in result.all():
+        grupos[row.dimension].append(row)
+    return grupos
+
+async def contar_estudiantes_resumen(db: AsyncSession, usuario_id: int) -> int:
+    """Estudiantes del usuario con métrica según el resumen, sin recorrerlos."""
+    result = await db.execute(
+        select(func.coalesce(func.sum(EstadisticaResumenModel.cantidad), 0)).where(
+            EstadisticaResumenModel.usuario_id == usuario_id,
+            EstadisticaResumenModel.dimension == TipoEstadistica.NIVEL_RIESGO.value
+        )
+    )
+    return result.scalar()
+
+async def _nombres_catalogo(db: AsyncSession, tipo: TipoEstadistica, grupos) -> dict:
+    # Las dimensiones de catálogo guardan el id; se resuelve su nombre
+    catalogo = CATALOGOS_DIMENSION.get(tipo)
+    if catalogo is None or not grupos:
+        return {}
+    result = await db.execute(
+        select(catalogo.id, catalogo.nombre).where(
+            catalogo.id.in_([int(row.grupo) for row in grupos])
+        )
+    )
+    return {str(item_id): nombre for item_id, nombre in result.all()}
+
+def _estadistica_promedio(grupos: dict) -> EstadisticaPromedio:
+    niveles = {row.grupo: row for row in grupos[TipoEstadistica.NIVEL_RIESGO.value]}
+    rangos = {row.grupo: row.cantidad for row in grupos[DIMENSION_RANGO]}
+
+    total = sum(row.cantidad for row in niveles.values())
+    suma = sum(row.suma_promedio for row in niveles.values())
+    distribucion_niveles = []
+    for nivel_riesgo in NivelRiesgo:
+        cantidad = niveles[nivel_riesgo.value].cantidad if nivel_riesgo.value in niveles else 0
+        distribucion_niveles.append(
+            EstadisticaItem(
+                etiqueta=nivel_riesgo.value,
+                cantidad=cantidad,
+                porcentaje=_porcentaje(cantidad, total)
+            )
+        )
+
+    return EstadisticaPromedio(
+        promedio_general=round(suma / total, 2) if total else 0.0,
+        distribucion_niveles=distribucion_niveles,
+        rango_promedios={
+            etiqueta: rangos.get(etiqueta, 0)
+            for etiqueta, _, _ in RANGOS_PROMEDIO
+        }
+    )
+
+def _estadistica_agrupada(grupos, etiquetas: dict) -> EstadisticaGeneral:
+    # Conteo de estudiantes por colegio, municipio, semestre o nivel de riesgo
+    total = sum(row.cantidad for row in grupos)
+    items = [
+        EstadisticaItem(
+            etiqueta=etiquetas.get(row.grupo, row.grupo),
+            cantidad=row.cantidad,
+            porcentaje=_porcentaje(row.cantidad, total)
+        )
+        for row in grupos
+    ]
+    return EstadisticaGeneral(
+        total_estudiantes=total,
+        items=sorted(items, key=lambda item: item.etiqueta)
+    )
+
+async def calcular_varias_estadisticas(db: AsyncSession, usuario_id: int, tipos) -> list:
+    """Estadísticas de los estudiantes del usuario, leídas de la caché o de la
+    tabla de resumen: el costo depende del número de grupos, no de estudiantes.
+
+    Los tipos que no están en caché se calculan con una sola consulta al
+    resumen (más una por catálogo para resolver nombres).
+    """
+    # La versión se lee antes de consultar: si otra transacción confirma en
+    # medio, el resultado queda guardado con la versión anterior
+    version = version_datos(usuario_id)
+    resultados = {}
+    for tipo in tipos:
+        estadisticas = cache_estadisticas.obtener((usuario_id, tipo, version))
+        if estadisticas is not None:
+            resultados[tipo] = estadisticas
+
+    faltantes = [tipo for tipo in dict.fromkeys(tipos) if tipo not in resultados]
+    if faltantes:
+        dimensiones = dict.fromkeys(
+            dimension for tipo in faltantes for dimension in DIMENSIONES_ESTADISTICA[tipo]
+        )
+        grupos = await _leer_resumen(db, usuario_id, dimensiones)
+        for tipo in faltantes:
+            if tipo == TipoEstadistica.PROMEDIO:
+                datos = _estadistica_promedio(grupos)
+            else:
+                grupos_tipo = grupos[tipo.value]
+                datos = _estadistica_agrupada(grupos_tipo, await _nombres_catalogo(db, tipo, grupos_tipo))
+            resultados[tipo] = EstadisticasResponse(tipo=tipo, datos=datos)
+            cache_estadisticas.guardar((usuario_id, tipo, version), resultados[tipo])
+
+    return [resultados[tipo] for tipo in tipos]
+
+async def calcular_estadisticas(db: AsyncSession, usuario_id: int, tipo: TipoEstadistica) -> EstadisticasResponse:
+    """Una estadística de los estudiantes del usuario (ver `calcular_varias_estadisticas`)."""
+    return (await calcular_varias_estadisticas(db, usuario_id, [tipo]))[0]
+
+# Estadísticas cruzadas (dos dimensiones)
+
+def _columna_cruce(dimension: DimensionCruce):
+    """Expresión de la dimensión y la unión que necesita (o None)."""
+    if dimension == DimensionCruce.SEMESTRE:
+        return EstudianteModel.semestre, None
+    if dimension == DimensionCruce.COLEGIO:
+        return ColegioEgresadoModel.nombre, (
+            ColegioEgresadoModel, EstudianteModel.colegio_egresado_id == ColegioEgresadoModel.id
+        )
+    if dimension == DimensionCruce.MUNICIPIO:
+        return MunicipioNacimientoModel.nombre, (
+            MunicipioNacimientoModel, EstudianteModel.municipio_nacimiento_id == MunicipioNacimientoModel.id
+        )
+    if dimension == DimensionCruce.ESTADO_MATRICULA:
+        return EstadoMatriculaModel.nombre, (
+            EstadoMatriculaModel, EstudianteModel.estado_matricula_id == EstadoMatriculaModel.id
+        )
+    # Como en la estadística por nivel de riesgo, solo cuenta estudiantes con métrica
+    return MetricaEvaluacionModel.nivel_riesgo, (
+        MetricaEvaluacionModel, EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
+    )
+
+async def calcular_estadistica_cruzada(
+    db: AsyncSession,
+    usuario_id: int,
+    filas: DimensionCruce,
+    columnas: DimensionCruce
+) -> EstadisticaCruzadaResponse:
+    """Conteo de estudiantes del usuario por dos dimensiones, con subtotales.
+
+    En PostgreSQL las celdas, los subtotales y el total salen de una sola
+    consulta con GROUPING SETS; SQLite no los soporta, así que ahí se agrupa
+    por las dos dimensiones y los subtotales se suman en Python.
+    """
+    clave = (usuario_id, ('cruce', filas, columnas), version_datos(usuario_id))
+    estadistica = cache_estadisticas.obtener(clave)
+    if estadistica is not None:
+        return estadistica
+
+    expresion_fila, union_fila = _columna_cruce(filas)
+    expresion_columna, union_columna = _columna_cruce(columnas)
+    base = select(
+        expresion_fila.label('fila'),
+        expresion_columna.label('columna')
+    ).select_from(EstudianteModel)
+    for union in (union_fila, union_columna):
+        if union is not None:
+            base = base.join(*union)
+    # Subconsulta con columnas simples para referirlas en GROUPING SETS
+    base = estudiantes_del_usuario(base, usuario_id).subquery()
+    fila, columna = base.c.fila, base.c.columna
+
+    if db.get_bind().dialect.name == "postgresql":
+        result = await db.execute(
+            select(
+                fila, columna,
+                func.count().label('cantidad'),
+                func.grouping(fila).label('total_filas'),
+                func.grouping(columna).label('total_columnas')
+            ).group_by(
+                func.grouping_sets(tuple_(fila, columna), tuple_(fila), tuple_(columna), tuple_())
+            )
+        )
+        celdas, totales_fila, totales_columna, total = [], {}, {}, 0
+        for row in result.all():
+            if row.total_filas and row.total_columnas:
+                total = row.cantidad
+            elif row.total_columnas:
+                totales_fila[str(row.fila)] = row.cantidad
+            elif row.total_filas:
+                totales_columna[str(row.columna)] = row.cantidad
+            else:
+                celdas.append(CeldaCruce(fila=str(row.fila), columna=str(row.columna), cantidad=row.cantidad))
+    else:
+        result = await db.execute(
+            select(fila, columna, func.count().label('cantidad')).group_by(fila, columna)
+        )
+        celdas, totales_fila, totales_columna, total = [], {}, {}, 0
+        for row in result.all():
+            celdas.append(CeldaCruce(fila=str(row.fila), columna=str(row.columna), cantidad=row.cantidad))
+            totales_fila[str(row.fila)] = totales_fila.get(str(row.fila), 0) + row.cantidad
+            totales_columna[str(row.columna)] = totales_columna.get(str(row.columna), 0) + row.cantidad
+            total += row.cantidad
+
+    estadistica = EstadisticaCruzadaResponse(
+        filas=filas,
+        columnas=columnas,
+        celdas=sorted(celdas, key=lambda celda: (celda.fila, celda.columna)),
+        totales_fila=dict(sorted(totales_fila.items())),
+        totales_columna=dict(sorted(totales_columna.items())),
+        total=total
+    )
+    cache_estadisticas.guardar(clave, estadistica)
+    return estadistica
+
+# Histograma y percentiles de promedios
+
+def bordes_por_ancho(ancho: float) -> List[float]:
+    """Bordes de intervalos de ancho fijo sobre ESCALA_PROMEDIO; el último
+    intervalo se recorta al final de la escala.
+
+    ValueError si el ancho no es finito y positivo o si genera más de
+    MAX_INTERVALOS_HISTOGRAMA intervalos (se comprueba antes de construirlos).
+    """
+    inicio, fin = ESCALA_PROMEDIO
+    if not math.isfinite(ancho) or ancho <= 0:
+        raise ValueError("El ancho de los intervalos debe ser un número positivo")
+    cantidad = math.ceil(round((fin - inicio) / ancho, 9))
+    if cantidad > MAX_INTERVALOS_HISTOGRAMA:
+        raise ValueError(f"El histograma admite como máximo {MAX_INTERVALOS_HISTOGRAMA} intervalos")
+    return [round(min(inicio + i * ancho, fin), 9) for i in range(cantidad + 1)]
+
+def _intervalo_sql(promedio, bordes: List[float], postgresql: bool):
+    """Índice (0..n-1) del intervalo [borde_i, borde_i+1) del promedio; el
+    último intervalo incluye su borde superior."""
+    ultimo = len(bordes) - 2
+    if postgresql:
+        # width_bucket devuelve 1..n para los bordes dados y n+1 en el último
+        return func.least(func.width_bucket(promedio, array(bordes, type_=Float)), ultimo + 1) - 1
+    return case(
+        *((promedio < borde, indice) for indice, borde in enumerate(bordes[1:-1])),
+        else_=ultimo
+    )
+
+async def _percentiles_sql(
+    db: AsyncSession, promedios, total: int, fracciones: List[float], postgresql: bool
+) -> List[Optional[float]]:
+    """Percentiles continuos (interpolación lineal, como percentile_cont)."""
+    if not total:
+        return [None] * len(fracciones)
+    if postgresql:
+        valores = (await db.execute(
+            select(func.percentile_cont(array(fracciones, type_=Float)).within_group(promedios.c.promedio))
+        )).scalar()
+        return list(valores)
+
+    # Sin percentile_cont: se numeran los valores ordenados y solo se leen las
+    # posiciones que hacen falta para interpolar
+    posiciones = {}
+    for fraccion in fracciones:
+        posicion = fraccion * (total - 1)
+        posiciones[fraccion] = (math.floor(posicion), math.ceil(posicion), posicion - math.floor(posicion))
+    numerados = select(
+        promedios.c.promedio,
+        (func.row_number().over(order_by=promedios.c.promedio) - 1).label('posicion')
+    ).subquery()
+    necesarias = {indice for inferior, superior, _ in posiciones.values() for indice in (inferior, superior)}
+    result = await db.execute(
+        select(numerados.c.posicion, numerados.c.promedio).where(numerados.c.posicion.in_(necesarias))
+    )
+    valores = dict(result.all())
+    return [
+        valores[inferior] + (valores[superior] - valores[inferior]) * peso
+        for inferior, superior, peso in (posiciones[fraccion] for fraccion in fracciones)
+    ]
+
+async def calcular_histograma_promedio(
+    db: AsyncSession,
+    usuario_id: int,
+    bordes: List[float],
+    percentiles: List[float]
+) -> HistogramaPromedioResponse:
+    """Histograma de los promedios del usuario con los bordes dados, más
+    mediana, cuartiles y los percentiles pedidos (0-100).
+
+    Todo se agrega en la base de datos: en PostgreSQL con width_bucket y
+    percentile_cont; en otros motores con CASE y ROW_NUMBER.
+    """
+    clave = (usuario_id, ('histograma', tuple(bordes), tuple(percentiles)), version_datos(usuario_id))
+    histograma = cache_estadisticas.obtener(clave)
+    if histograma is not None:
+        return histograma
+
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    promedios = estudiantes_del_usuario(
+        select(MetricaEvaluacionModel.promedio).select_from(EstudianteModel).join(
+            MetricaEvaluacionModel, EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
+        ),
+        usuario_id
+    ).where(MetricaEvaluacionModel.promedio.is_not(None)).subquery()
+    total = (await db.execute(select(func.count()).select_from(promedios))).scalar()
+
+    # Subconsulta con el índice ya calculado para agrupar por una columna simple
+    indices = select(
+        _intervalo_sql(promedios.c.promedio, bordes, postgresql).label('intervalo')
+    ).where(promedios.c.promedio.between(bordes[0], bordes[-1])).subquery()
+    result = await db.execute(
+        select(indices.c.intervalo, func.count()).group_by(indices.c.intervalo)
+    )
+    cantidades = dict(result.all())
+
+    cuartiles = [0.25, 0.5, 0.75]
+    fracciones = cuartiles + [percentil / 100 for percentil in percentiles]
+    valores = await _percentiles_sql(db, promedios, total, fracciones, postgresql)
+    valores = [round(valor, 4) if valor is not None else None for valor in valores]
+
+    histograma = HistogramaPromedioResponse(
+        total_estudiantes=total,
+        intervalos=[
+            IntervaloHistograma(minimo=minimo, maximo=maximo, cantidad=cantidades.get(indice, 0))
+            for indice, (minimo, maximo) in enumerate(zip(bordes, bordes[1:]))
+        ],
+        mediana=valores[1],
+        cuartiles={"q1": valores[0], "q2": valores[1], "q3": valores[2]},
+        percentiles={
+            f"p{percentil:g}": valor
+            for percentil, valor in zip(percentiles, valores[len(cuartiles):])
+        }
+    )
+    cache_estadisticas.guardar(clave, histograma)
+    return histograma
@@ -0,0 +1,55 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import io
+
+# Renderizado de diagramas. Se ejecuta en el pool de procesos, por lo que
+# recibe y devuelve solo valores serializables.
+#
+# No se usa pyplot: su estado global (figura "actual", registro de figuras
+# abiertas) se comparte entre renderizados y conserva cada figura hasta
+# cerrarla. Cada llamada crea su propia Figure sobre un lienzo Agg y la
+# libera al terminar.
+
+# Formato, tamaño (pulgadas) y resolución por defecto de los diagramas
+FORMATO_GRAFICO = "png"
+TAMANO_GRAFICO = (10, 6)
+DPI_GRAFICO = 100
+
+# Tipo de contenido de cada formato de imagen soportado
+TIPOS_CONTENIDO_GRAFICO = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+
+def _dibujar(ax, labels, values, tipo_diagrama: str):
+    if tipo_diagrama == "barras":
+        ax.bar(labels, values)
+        ax.tick_params(axis='x', labelrotation=45)
+        ax.set_ylabel('Cantidad')
+    elif tipo_diagrama == "torta":
+        ax.pie(values, labels=labels, autopct='%1.1f%%')
+    elif tipo_diagrama == "lineas":
+        ax.plot(labels, values, marker='o')
+        ax.tick_params(axis='x', labelrotation=45)
+        ax.set_ylabel('Cantidad')
+
+def renderizar_grafico(
+    labels, values, tipo_diagrama: str, titulo: str,
+    formato: str = FORMATO_GRAFICO, tamano=TAMANO_GRAFICO, dpi: int = DPI_GRAFICO
+) -> bytes:
+    """Dibuja el diagrama y devuelve la imagen en el formato indicado."""
+    figura = Figure(figsize=tamano, dpi=dpi)
+    FigureCanvasAgg(figura)
+    try:
+        ax = figura.add_subplot()
+        _dibujar(ax, labels, values, tipo_diagrama)
+        ax.set_title(titulo)
+
+        # Guardar el gráfico en un buffer
+        with io.BytesIO() as buf:
+            figura.savefig(buf, format=formato, bbox_inches='tight')
+            return buf.getvalue()
+    finally:
+        # Liberar artistas y el buffer del lienzo sin esperar al recolector
+        figura.clear()
@@ -0,0 +1,515 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, tuple_, func, literal, text, Table, MetaData, Column, Float
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+from app.core.config import (
+    IMPORTACION_TAMANO_LOTE, IMPORTACION_MAX_ERRORES, IMPORTACION_MEDIR_MEMORIA
+)
+from app.db.database import dialect_insert
+from app.models.EstudianteModel import EstudianteModel
+from app.models.MetricaEvaluacionModel import MetricaEvaluacionModel
+from app.models.UsuarioEstudianteModel import UsuarioEstudianteModel
+from app.models.TipoDocumentoModel import TipoDocumentoModel
+from app.models.EstadoMatriculaModel import EstadoMatriculaModel
+from app.models.ColegioEgresadoModel import ColegioEgresadoModel
+from app.models.MunicipioNacimientoModel import MunicipioNacimientoModel
+from app.core.ejecutores import ejecutar_en_hilo
+from app.services.catalogoService import insertar_faltantes
+from app.services.estadisticasService import ajustar_resumen, calcular_nivel_riesgo, nivel_riesgo_sql
+from typing import Optional
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import os
+import pandas as pd
+
+# Columna del archivo, campo de estudiante, etiqueta para errores y catálogo
+CATALOGOS_IMPORTACION = [
+    ('Tipo Doc', 'tipo_documento_id', 'Tipo de documento', TipoDocumentoModel),
+    ('Estado Matricula', 'estado_matricula_id', 'Estado de matrícula', EstadoMatriculaModel),
+    ('Colegio Egresado', 'colegio_egresado_id', 'Colegio', ColegioEgresadoModel),
+    ('Municipio Nacimiento', 'municipio_nacimiento_id', 'Municipio', MunicipioNacimientoModel),
+]
+
+# Columnas de texto requeridas y opcionales del archivo y su campo de estudiante
+COLUMNAS_TEXTO = {
+    'Codigo Alumno': 'codigo',
+    'Nombre Alumno': 'nombre',
+    'Documento': 'documento',
+    'Semestre': 'semestre',
+    'Pensum': 'pensum',
+    'Ingreso': 'ingreso',
+    'Email Institucional': 'email_institucional',
+}
+
+COLUMNAS_TEXTO_OPCIONAL = {
+    'Celular': 'celular',
+    'Email': 'email_personal',
+}
+
+# Columnas de estudiante que se sobrescriben cuando (codigo, documento) ya existe
+COLUMNAS_ACTUALIZABLES = [
+    'nombre', 'tipo_documento_id', 'semestre', 'pensum', 'ingreso',
+    'estado_matricula_id', 'celular', 'email_personal', 'email_institucional',
+    'colegio_egresado_id', 'municipio_nacimiento_id'
+]
+
+# Campos cubiertos por la huella: si no cambian, la fila no se vuelve a escribir
+CAMPOS_HUELLA = COLUMNAS_ACTUALIZABLES + ['promedio']
+
+async def leer_siguiente_bloque(bloques):
+    """Obtiene el siguiente bloque de `leer_por_bloques` sin bloquear el event loop.
+
+    Devuelve None al terminar el archivo.
+    """
+    lectura = asyncio.ensure_future(ejecutar_en_hilo(next, bloques, None, esperar=True))
+    try:
+        return await asyncio.shield(lectura)
+    except asyncio.CancelledError:
+        # Esperar a que el hilo suelte el generador antes de que se cierre el libro
+        await asyncio.gather(lectura, return_exceptions=True)
+        raise
+
+def memoria_residente() -> Optional[int]:
+    """Memoria residente (RSS) actual del proceso en bytes; None si el sistema
+    no la expone (se lee de /proc, disponible en Linux)."""
+    try:
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class MedicionMemoria:
+    """Crecimiento de la memoria residente durante una importación: la
+    diferencia entre la mayor muestra y la inicial. Se muestrea al crearla y
+    en cada llamada a `muestrear` (tras validar y escribir cada lote).
+
+    Solo mide con IMPORTACION_MEDIR_MEMORIA activo; si no, `pico_mb` es None.
+    Es memoria del proceso, así que puede incluir otras peticiones
+    simultáneas; no incluye la lectura en el pool de procesos.
+    """
+
+    def __init__(self):
+        self.inicial = memoria_residente() if IMPORTACION_MEDIR_MEMORIA else None
+        self.pico = self.inicial
+
+    def muestrear(self):
+        if self.inicial is None:
+            return
+        actual = memoria_residente()
+        if actual is not None and actual > self.pico:
+            self.pico = actual
+
+    @property
+    def pico_mb(self) -> Optional[float]:
+        if self.inicial is None:
+            return None
+        return round((self.pico - self.inicial) / (1024 * 1024), 2)
+
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """Texto de cada valor de la columna. Los enteros leídos como float (una
+    columna numérica con celdas vacías) se escriben sin ".0": si no, el mismo
+    código o documento no coincidiría con el ya guardado."""
+    return serie.map(
+        lambda valor: str(int(valor)) if isinstance(valor, float) and valor.is_integer() else str(valor)
+    )
+
+class ErrorValidacion(ValueError):
+    """Filas del archivo que no pasaron la validación; `errores` trae un mensaje por fila."""
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(
+            f"{len(errores)} filas con errores: " + "; ".join(errores[:IMPORTACION_MAX_ERRORES])
+        )
+
+class ImportadorEstudiantes:
+    """Importa estudiantes por lotes: una consulta de existentes y unas pocas
+    sentencias masivas (estudiante, métrica, relación) por lote, en lugar de
+    tres SELECT y un flush por fila. Las filas sin cambios (misma huella) se
+    omiten.
+
+    Con `usar_copy` en PostgreSQL/asyncpg cada DataFrame se carga con COPY
+    y se aplica con sentencias set-based (ver `_escribir_copy`). Con
+    `crear_catalogos` los valores de catálogo desconocidos se crean en bloque
+    en lugar de invalidar la fila.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        usuario_id: int,
+        omitir_invalidos: bool = False,
+        usar_copy: bool = False,
+        crear_catalogos: bool = False,
+        tamano_lote: int = IMPORTACION_TAMANO_LOTE,
+        memoria: Optional[MedicionMemoria] = None
+    ):
+        self.db = db
+        self.memoria = memoria
+        self.usuario_id = usuario_id
+        self.omitir_invalidos = omitir_invalidos
+        self.crear_catalogos = crear_catalogos
+        # COPY solo existe con asyncpg; con otros drivers (p. ej. SQLite en
+        # desarrollo) se usa el mismo flujo con INSERT por lotes
+        self.usar_copy = usar_copy and db.get_bind().dialect.driver == "asyncpg"
+        self.tamano_lote = tamano_lote
+        self.catalogos = None
+        self.creados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.fallidos = 0
+        self.catalogos_creados = 0
+        self.errores = []
+
+    @property
+    def modo_escritura(self) -> str:
+        return "copy" if self.usar_copy else "lotes"
+
+    @property
+    def procesados(self) -> int:
+        return self.creados + self.actualizados + self.sin_cambios + self.fallidos
+
+    def registrar_error(self, mensaje: str):
+        """Cuenta una fila inválida omitida; conserva solo los primeros mensajes."""
+        self.fallidos += 1
+        if len(self.errores) < IMPORTACION_MAX_ERRORES:
+            self.errores.append(mensaje)
+
+    async def cargar_catalogos(self):
+        """Carga los catálogos una sola vez como diccionarios nombre -> id."""
+        catalogos = {}
+        for columna, _, _, model_class in CATALOGOS_IMPORTACION:
+            result = await self.db.execute(select(model_class.nombre, model_class.id))
+            catalogos[columna] = dict(result.all())
+        self.catalogos = catalogos
+
+    async def crear_catalogos_faltantes(self, df: pd.DataFrame):
+        """Crea en bloque los valores de catálogo del DataFrame que aún no
+        existen y los agrega a los catálogos cargados."""
+        for columna, _, _, model_class in CATALOGOS_IMPORTACION:
+            catalogo = self.catalogos[columna]
+            faltantes = [
+                valor for valor in df[columna].dropna().unique()
+                if isinstance(valor, str) and valor not in catalogo
+            ]
+            if not faltantes:
+                continue
+            ids, creados = await insertar_faltantes(self.db, model_class, faltantes)
+            # Los nombres se guardan sin espacios alrededor
+            for valor in faltantes:
+                if valor.strip() in ids:
+                    catalogo[valor] = ids[valor.strip()]
+            self.catalogos_creados += creados
+
+    def validar(self, df: pd.DataFrame):
+        """Valida el DataFrame completo columna a columna.
+
+        Devuelve las filas válidas como diccionarios de valores de columna y la
+        lista de errores, un mensaje por fila inválida con todos sus problemas.
+        """
+        problemas = []  # Series de mensajes indexadas por número de fila
+        salida = pd.DataFrame(index=df.index)
+
+        for columna, campo in COLUMNAS_TEXTO.items():
+            salida[campo] = _como_texto(df[columna])
+            vacios = df[columna].isna() | (salida[campo].str.strip() == '')
+            if vacios.any():
+                problemas.append(pd.Series(f"Campo requerido vacío: {columna}", index=df.index[vacios]))
+        for columna, campo in COLUMNAS_TEXTO_OPCIONAL.items():
+            salida[campo] = _como_texto(df[columna]).where(df[columna].notna(), None)
+
+        for columna, campo, etiqueta, _ in CATALOGOS_IMPORTACION:
+            salida[campo] = df[columna].map(self.catalogos[columna])
+            faltantes = salida[campo].isna()
+            if faltantes.any():
+                problemas.append(f"{etiqueta} no encontrado: " + df.loc[faltantes, columna].astype(str))
+
+        promedio = pd.to_numeric(df['Promedio'], errors='coerce')
+        invalidos = promedio.isna()
+        if invalidos.any():
+            problemas.append(
+                "El promedio debe ser un número válido. Valor recibido: "
+                + df.loc[invalidos, 'Promedio'].astype(str)
+            )
+
+        errores = []
+        filas_invalidas = pd.Index([])
+        if problemas:
+            por_fila = pd.concat(problemas).groupby(level=0).agg('; '.join)
+            filas_invalidas = por_fila.index
+            errores = [
+                f"Error en la fila {numero_fila}: {mensaje}"
+                for numero_fila, mensaje in por_fila.items()
+            ]
+
+        validas = ~df.index.isin(filas_invalidas)
+        salida = salida[validas]
+        for _, campo, _, _ in CATALOGOS_IMPORTACION:
+            salida[campo] = salida[campo].astype(int)
+        salida['promedio'] = promedio[validas].astype(float).round(2)
+        salida['huella'] = [
+            calcular_huella(valores)
+            for valores in zip(*(salida[campo].tolist() for campo in CAMPOS_HUELLA))
+        ]
+
+        # tolist() entrega tipos nativos de Python (asyncpg no acepta numpy.int64)
+        columnas = list(salida.columns)
+        valores = zip(*(salida[columna].tolist() for columna in columnas))
+        return [dict(zip(columnas, fila)) for fila in valores], errores
+
+    async def procesar(self, df: pd.DataFrame):
+        """Valida todas las filas del DataFrame y escribe las válidas por lotes.
+
+        Con `omitir_invalidos` las filas inválidas se cuentan como fallidas y
+        se omiten; si no, cualquier fila inválida lanza ErrorValidacion con
+        todos los errores del DataFrame antes de escribir nada.
+
+        El índice del DataFrame debe ser el número de fila en la hoja
+        (ver `lectoresArchivo.leer_archivo`), usado en los mensajes de error.
+        """
+        if self.catalogos is None:
+            await self.cargar_catalogos()
+        if self.crear_catalogos:
+            await self.crear_catalogos_faltantes(df)
+
+        filas, errores = self.validar(df)
+        if self.memoria is not None:
+            self.memoria.muestrear()
+        if errores:
+            if not self.omitir_invalidos:
+                raise ErrorValidacion(errores)
+            for mensaje in errores:
+                self.registrar_error(mensaje)
+
+        if not filas:
+            return
+        if self.usar_copy:
+            await self._escribir_copy(filas)
+            return
+        for inicio in range(0, len(filas), self.tamano_lote):
+            await self._escribir_lote(filas[inicio:inicio + self.tamano_lote])
+            if self.memoria is not None:
+                self.memoria.muestrear()
+
+    async def _escribir_lote(self, filas):
+        """Escribe un lote de forma incremental: las filas cuya huella coincide
+        con la guardada no se escriben; de las que cambiaron solo se actualizan
+        las columnas distintas."""
+        por_clave = _deduplicar(filas)
+
+        # Estado actual de los estudiantes del lote (con su promedio)
+        result = await self.db.execute(
+            select(
+                EstudianteModel.id, EstudianteModel.codigo, EstudianteModel.documento,
+                EstudianteModel.huella,
+                *(getattr(EstudianteModel, columna) for columna in COLUMNAS_ACTUALIZABLES),
+                MetricaEvaluacionModel.promedio
+            ).outerjoin(
+                MetricaEvaluacionModel,
+                EstudianteModel.id == MetricaEvaluacionModel.estudiante_id
+            ).where(
+                tuple_(EstudianteModel.codigo, EstudianteModel.documento).in_(list(por_clave))
+            )
+        )
+        existentes = {(row.codigo, row.documento): row for row in result.all()}
+
+        nuevos = []
+        cambios_estudiante = []
+        cambios_metrica = []
+        ids = {}
+        for clave, fila in por_clave.items():
+            actual = existentes.get(clave)
+            if actual is None:
+                nuevos.append(fila)
+                continue
+
+            ids[clave] = actual.id
+            if actual.huella == fila['huella']:
+                self.sin_cambios += 1
+                continue
+
+            cambios = {
+                columna: fila[columna] for columna in COLUMNAS_ACTUALIZABLES
+                if getattr(actual, columna) != fila[columna]
+            }
+            if cambios or actual.promedio != fila['promedio']:
+                self.actualizados += 1
+            else:
+                # Solo faltaba la huella (filas anteriores a su introducción)
+                self.sin_cambios += 1
+            cambios['id'] = actual.id
+            cambios['huella'] = fila['huella']
+            cambios_estudiante.append(cambios)
+            if actual.promedio != fila['promedio']:
+                cambios_metrica.append({
+                    'estudiante_id': actual.id,
+                    'promedio': fila['promedio'],
+                    'nivel_riesgo': calcular_nivel_riesgo(fila['promedio']).value
+                })
+
+        # Relaciones usuario-estudiante ya existentes
+        result = await self.db.execute(
+            select(UsuarioEstudianteModel.estudiante_id).where(
+                UsuarioEstudianteModel.usuario_id == self.usuario_id,
+                UsuarioEstudianteModel.estudiante_id.in_(list(ids.values()))
+            )
+        )
+        vinculados = set(result.scalars().all())
+
+        # Restar del resumen de estadísticas el aporte previo de los existentes
+        # que cambian o se vinculan al usuario; se vuelve a sumar al final
+        afectados = {cambios['id'] for cambios in cambios_estudiante}
+        afectados.update(estudiante_id for estudiante_id in ids.values() if estudiante_id not in vinculados)
+        await ajustar_resumen(self.db, afectados, -1)
+
+        # Actualizar solo las columnas modificadas (UPDATE por clave primaria,
+        # agrupado por conjunto de columnas)
+        if cambios_estudiante:
+            cambios_estudiante.sort(key=lambda cambios: sorted(cambios))
+            await self.db.execute(update(EstudianteModel), cambios_estudiante)
+
+        # Crear estudiantes nuevos
+        if nuevos:
+            stmt = dialect_insert(self.db, EstudianteModel).values([
+                {columna: valor for columna, valor in fila.items() if columna != 'promedio'}
+                for fila in nuevos
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['codigo', 'documento'],
+                set_={columna: stmt.excluded[columna] for columna in COLUMNAS_ACTUALIZABLES + ['huella']}
+            ).returning(EstudianteModel.id, EstudianteModel.codigo, EstudianteModel.documento)
+            result = await self.db.execute(stmt)
+            for row in result.all():
+                ids[(row.codigo, row.documento)] = row.id
+                afectados.add(row.id)
+                promedio = por_clave[(row.codigo, row.documento)]['promedio']
+                cambios_metrica.append({
+                    'estudiante_id': row.id,
+                    'promedio': promedio,
+                    'nivel_riesgo': calcular_nivel_riesgo(promedio).value
+                })
+            self.creados += len(nuevos)
+
+        # Crear o actualizar métricas de evaluación que cambiaron
+        if cambios_metrica:
+            stmt = dialect_insert(self.db, MetricaEvaluacionModel).values(cambios_metrica)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['estudiante_id'],
+                set_={'promedio': stmt.excluded.promedio, 'nivel_riesgo': stmt.excluded.nivel_riesgo}
+            )
+            await self.db.execute(stmt)
+
+        # Crear las relaciones usuario-estudiante que falten
+        faltantes = [estudiante_id for estudiante_id in ids.values() if estudiante_id not in vinculados]
+        if faltantes:
+            stmt = dialect_insert(self.db, UsuarioEstudianteModel).values([
+                {'usuario_id': self.usuario_id, 'estudiante_id': estudiante_id}
+                for estudiante_id in faltantes
+            ])
+            stmt = stmt.on_conflict_do_nothing(index_elements=['usuario_id', 'estudiante_id'])
+            await self.db.execute(stmt)
+
+        await ajustar_resumen(self.db, afectados, 1)
+
+    async def _escribir_copy(self, filas):
+        """Carga las filas con COPY binario en una tabla de staging y las aplica
+        a estudiante, metrica_evaluacion y usuario_estudiante con tres
+        sentencias INSERT ... SELECT ... ON CONFLICT."""
+        por_clave = _deduplicar(filas)
+
+        # La tabla temporal no se registra en el WAL y es privada de la conexión,
+        # así que importaciones concurrentes no se mezclan
+        await self.db.execute(CreateTable(_staging, if_not_exists=True))
+        await self.db.execute(text(f"TRUNCATE {_staging.name}"))
+        conexion = await self.db.connection()
+        raw = await conexion.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _staging.name,
+            records=[tuple(fila[columna] for columna in _COLUMNAS_STAGING) for fila in por_clave.values()],
+            columns=_COLUMNAS_STAGING
+        )
+
+        coincide = (
+            (EstudianteModel.codigo == _staging.c.codigo) &
+            (EstudianteModel.documento == _staging.c.documento)
+        )
+        conteo = (await self.db.execute(
+            select(
+                func.count().label('existentes'),
+                func.count().filter(EstudianteModel.huella == _staging.c.huella).label('sin_cambios')
+            ).select_from(_staging).join(EstudianteModel, coincide)
+        )).one()
+        self.sin_cambios += conteo.sin_cambios
+        self.actualizados += conteo.existentes - conteo.sin_cambios
+        self.creados += len(por_clave) - conteo.existentes
+
+        # Resumen de estadísticas: restar el aporte previo de los estudiantes
+        # del bloque y sumarlo de nuevo al final
+        ids_bloque = select(EstudianteModel.id).join(_staging, coincide)
+        await ajustar_resumen(self.db, ids_bloque, -1)
+
+        # Crear o actualizar estudiantes
+        columnas_estudiante = [columna for columna in _COLUMNAS_STAGING if columna != 'promedio']
+        stmt = postgresql.insert(EstudianteModel).from_select(
+            columnas_estudiante,
+            select(*(_staging.c[columna] for columna in columnas_estudiante))
+        )
+        # Las filas con la misma huella no se reescriben
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['codigo', 'documento'],
+            set_={columna: stmt.excluded[columna] for columna in COLUMNAS_ACTUALIZABLES + ['huella']},
+            where=EstudianteModel.huella.is_distinct_from(stmt.excluded.huella)
+        )
+        await self.db.execute(stmt)
+
+        # Crear o actualizar métricas de evaluación
+        stmt = postgresql.insert(MetricaEvaluacionModel).from_select(
+            ['estudiante_id', 'promedio', 'nivel_riesgo'],
+            select(
+                EstudianteModel.id, _staging.c.promedio, nivel_riesgo_sql(_staging.c.promedio)
+            ).join(EstudianteModel, coincide)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['estudiante_id'],
+            set_={'promedio': stmt.excluded.promedio, 'nivel_riesgo': stmt.excluded.nivel_riesgo},
+            where=MetricaEvaluacionModel.promedio.is_distinct_from(stmt.excluded.promedio)
+        )
+        await self.db.execute(stmt)
+
+        # Crear las relaciones usuario-estudiante que falten
+        stmt = postgresql.insert(UsuarioEstudianteModel).from_select(
+            ['usuario_id', 'estudiante_id', 'fecha_indexacion'],
+            select(
+                literal(self.usuario_id), EstudianteModel.id, literal(datetime.utcnow())
+            ).select_from(_staging).join(EstudianteModel, coincide)
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=['usuario_id', 'estudiante_id'])
+        await self.db.execute(stmt)
+
+        await ajustar_resumen(self.db, ids_bloque, 1)
+
+def calcular_huella(valores) -> str:
+    """Huella del contenido importable de un estudiante (ver CAMPOS_HUELLA)."""
+    contenido = json.dumps(list(valores), ensure_ascii=False)
+    return hashlib.blake2b(contenido.encode(), digest_size=16).hexdigest()
+
+def _deduplicar(filas) -> dict:
+    # Una misma clave repetida solo puede afectarse una vez por sentencia
+    # ON CONFLICT; como en el proceso fila a fila, gana la última
+    return {(fila['codigo'], fila['documento']): fila for fila in filas}
+
+# Tabla de staging para COPY: las columnas de estudiante (sin id) más el promedio
+_staging = Table(
+    "importacion_estudiante",
+    MetaData(),
+    *(
+        Column(columna.name, columna.type)
+        for columna in EstudianteModel.__table__.columns
+        if columna.name != 'id'
+    ),
+    Column('promedio', Float),
+    prefixes=["TEMPORARY"]
+)
+_COLUMNAS_STAGING = [columna.name for columna in _staging.columns]
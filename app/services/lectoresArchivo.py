@@ -0,0 +1,202 @@
+from app.core.config import IMPORTACION_TAMANO_BLOQUE
+from openpyxl import load_workbook
+from typing import Optional
+import os
+import pandas as pd
+import shutil
+import tempfile
+
+# Lectores de archivos de importación. Este módulo no depende de la base de
+# datos para que sus funciones puedan ejecutarse en el pool de procesos.
+
+COLUMNAS_REQUERIDAS = [
+    'Codigo Alumno', 'Nombre Alumno', 'Tipo Doc', 'Documento',
+    'Semestre', 'Pensum', 'Ingreso', 'Promedio', 'Estado Matricula',
+    'Celular', 'Email', 'Email Institucional', 'Colegio Egresado',
+    'Municipio Nacimiento'
+]
+
+# Formatos aceptados: extensiones y tipos de contenido de cada uno. Parquet y
+# Arrow requieren pyarrow, que se importa solo al leer esos formatos.
+FORMATOS_IMPORTACION = {
+    'xlsx': {
+        'extensiones': ('.xlsx',),
+        'tipos_contenido': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',)
+    },
+    'csv': {
+        'extensiones': ('.csv',),
+        'tipos_contenido': ('text/csv', 'application/csv')
+    },
+    'parquet': {
+        'extensiones': ('.parquet', '.pq'),
+        'tipos_contenido': ('application/vnd.apache.parquet', 'application/x-parquet')
+    },
+    'arrow': {
+        'extensiones': ('.arrow', '.feather', '.ipc'),
+        'tipos_contenido': ('application/vnd.apache.arrow.file', 'application/vnd.apache.arrow.stream')
+    },
+}
+
+def verificar_columnas(columnas):
+    """Lanza ValueError si faltan columnas requeridas en el archivo."""
+    columnas_faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in columnas]
+    if columnas_faltantes:
+        raise ValueError(f"Faltan las siguientes columnas en el archivo: {', '.join(columnas_faltantes)}")
+
+def detectar_formato(nombre_archivo: Optional[str], tipo_contenido: Optional[str] = None) -> Optional[str]:
+    """Formato de importación según la extensión o, si no se reconoce, el tipo de contenido."""
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    tipo = (tipo_contenido or '').split(';')[0].strip().lower()
+    for formato, datos in FORMATOS_IMPORTACION.items():
+        if extension in datos['extensiones']:
+            return formato
+    for formato, datos in FORMATOS_IMPORTACION.items():
+        if tipo in datos['tipos_contenido']:
+            return formato
+    return None
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Para importar archivos Parquet o Arrow se requiere el paquete pyarrow")
+    return pyarrow
+
+def leer_archivo(ruta: str, formato: str) -> pd.DataFrame:
+    """Lee el archivo completo. El índice del DataFrame es el número de fila en
+    la hoja (Excel y CSV, contando el encabezado) o el número de registro (Parquet y Arrow)."""
+    if formato == 'xlsx':
+        return leer_excel(ruta)
+    if formato == 'csv':
+        df = pd.read_csv(ruta, **_OPCIONES_CSV)
+        df.index = df.index + 2
+        return df
+
+    pa = _importar_pyarrow()
+    if formato == 'parquet':
+        tabla = pa.parquet.read_table(ruta)
+    else:
+        with pa.memory_map(ruta) as origen:
+            tabla = _abrir_arrow(pa, origen).read_all()
+    df = tabla.to_pandas(integer_object_nulls=True)
+    df.index = df.index + 1
+    return df
+
+def leer_por_bloques(archivo, formato: str, tamano_bloque: int = IMPORTACION_TAMANO_BLOQUE):
+    """Generador de DataFrames de a lo sumo `tamano_bloque` filas para cualquier formato."""
+    if formato == 'xlsx':
+        return leer_excel_por_bloques(archivo, tamano_bloque)
+    if formato == 'csv':
+        return leer_csv_por_bloques(archivo, tamano_bloque)
+    if formato == 'parquet':
+        return leer_parquet_por_bloques(archivo, tamano_bloque)
+    return leer_arrow_por_bloques(archivo, tamano_bloque)
+
+def leer_excel(archivo) -> pd.DataFrame:
+    """Lee el Excel completo; el índice del DataFrame es el número de fila en la hoja.
+
+    Como `leer_excel_por_bloques`, conserva el valor de cada celda (dtype
+    object): ambos modos deben entregar lo mismo para una misma celda.
+    """
+    df = pd.read_excel(archivo, dtype=object)
+    df.index = df.index + 2
+    return df
+
+def leer_excel_por_bloques(archivo, tamano_bloque: int = IMPORTACION_TAMANO_BLOQUE):
+    """Recorre la primera hoja en modo solo lectura y genera DataFrames de a lo
+    sumo `tamano_bloque` filas, sin cargar el libro completo en memoria.
+
+    El índice de cada bloque es el número de fila en la hoja.
+    """
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas_hoja = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = [str(columna) if columna is not None else None for columna in next(filas_hoja, ())]
+        verificar_columnas(encabezado)
+
+        filas, numeros_fila = [], []
+        for numero_fila, fila in enumerate(filas_hoja, start=2):
+            # Las filas vacías se omiten, igual que al final de la hoja en pd.read_excel
+            if all(valor is None for valor in fila):
+                continue
+            filas.append(fila)
+            numeros_fila.append(numero_fila)
+            if len(filas) == tamano_bloque:
+                yield pd.DataFrame(filas, columns=encabezado, index=numeros_fila, dtype=object)
+                filas, numeros_fila = [], []
+        if filas:
+            yield pd.DataFrame(filas, columns=encabezado, index=numeros_fila, dtype=object)
+    finally:
+        libro.close()
+
+# Los CSV se leen como texto: los valores vacíos son nulos, pero textos como
+# "NA" o "null" se conservan (pueden ser nombres válidos de catálogo)
+_OPCIONES_CSV = {
+    'dtype': str,
+    'keep_default_na': False,
+    'na_values': [''],
+    'encoding': 'utf-8-sig',
+}
+
+def leer_csv_por_bloques(archivo, tamano_bloque: int = IMPORTACION_TAMANO_BLOQUE):
+    """Lee el CSV por bloques sin cargarlo completo; el índice de cada bloque
+    es el número de línea (el encabezado es la línea 1)."""
+    with pd.read_csv(archivo, chunksize=tamano_bloque, **_OPCIONES_CSV) as lector:
+        for bloque in lector:
+            verificar_columnas(bloque.columns)
+            bloque.index = bloque.index + 2
+            yield bloque
+
+def _bloques_arrow(esquema, lotes, tamano_bloque: int):
+    # Reparte los record batches en DataFrames de a lo sumo `tamano_bloque`
+    # filas; el índice es el número de registro (desde 1)
+    verificar_columnas(esquema.names)
+    inicio = 1
+    for lote in lotes:
+        for desde in range(0, lote.num_rows, tamano_bloque):
+            parte = lote.slice(desde, tamano_bloque)
+            # integer_object_nulls evita que los enteros con nulos pasen a float
+            df = parte.to_pandas(integer_object_nulls=True)
+            df.index = pd.RangeIndex(inicio, inicio + len(df))
+            inicio += len(df)
+            yield df
+
+def leer_parquet_por_bloques(archivo, tamano_bloque: int = IMPORTACION_TAMANO_BLOQUE):
+    """Lee el Parquet por record batches sin cargar la tabla completa."""
+    pa = _importar_pyarrow()
+    parquet = pa.parquet.ParquetFile(archivo)
+    try:
+        yield from _bloques_arrow(
+            parquet.schema_arrow, parquet.iter_batches(batch_size=tamano_bloque), tamano_bloque
+        )
+    finally:
+        parquet.close()
+
+def _abrir_arrow(pa, origen):
+    # Arrow IPC tiene dos variantes: archivo (con pie e índice de lotes) y stream
+    try:
+        return pa.ipc.open_file(origen)
+    except pa.ArrowInvalid:
+        origen.seek(0)
+        return pa.ipc.open_stream(origen)
+
+def leer_arrow_por_bloques(archivo, tamano_bloque: int = IMPORTACION_TAMANO_BLOQUE):
+    """Lee un archivo Arrow IPC (formato archivo o stream) lote a lote."""
+    pa = _importar_pyarrow()
+    lector = _abrir_arrow(pa, archivo)
+    if isinstance(lector, pa.ipc.RecordBatchFileReader):
+        lotes = (lector.get_batch(i) for i in range(lector.num_record_batches))
+    else:
+        lotes = lector
+    yield from _bloques_arrow(lector.schema, lotes, tamano_bloque)
+
+def guardar_temporal(origen, sufijo: str = ".xlsx") -> str:
+    """Copia un archivo abierto a un temporal con nombre y devuelve su ruta.
+
+    El llamador es responsable de eliminarlo.
+    """
+    with tempfile.NamedTemporaryFile(suffix=sufijo, delete=False) as destino:
+        shutil.copyfileobj(origen, destino)
+        return destino.name
@@ -0,0 +1,231 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete
+from app.config.database import AsyncSessionLocal
+from app.core.config import IMPORTACION_TRABAJOS_CONCURRENTES, IMPORTACION_TRABAJOS_RETENIDOS
+from app.models.ImportacionTrabajoModel import ImportacionTrabajoModel
+from app.schemas.importacion import EstadoTrabajo, TrabajoImportacion
+from app.core.ejecutores import ejecutar_en_hilo
+from app.services.importacionService import ImportadorEstudiantes, leer_siguiente_bloque
+from app.services.lectoresArchivo import leer_por_bloques, guardar_temporal
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import os
+import uuid
+
+# El estado de los trabajos vive en la tabla importacion_trabajo, así que
+# cualquier worker responde las consultas. La tarea corre en el worker que
+# recibió la subida (el único con el archivo temporal); los demás solo pueden
+# pedir su cancelación, que la tarea atiende entre bloques.
+
+# Limita cuántas importaciones se ejecutan a la vez en este proceso; el resto
+# espera en estado pendiente
+_cupos = None
+# Tareas de los trabajos que se ejecutan en este proceso
+_tareas: Dict[str, asyncio.Task] = {}
+
+def _reporte(trabajo: ImportacionTrabajoModel) -> TrabajoImportacion:
+    return TrabajoImportacion(
+        id=trabajo.id,
+        archivo=trabajo.archivo,
+        estado=trabajo.estado,
+        filas_procesadas=trabajo.filas_procesadas,
+        estudiantes_creados=trabajo.estudiantes_creados,
+        estudiantes_actualizados=trabajo.estudiantes_actualizados,
+        estudiantes_sin_cambios=trabajo.estudiantes_sin_cambios,
+        filas_fallidas=trabajo.filas_fallidas,
+        catalogos_creados=trabajo.catalogos_creados,
+        errores=trabajo.errores,
+        mensaje=trabajo.mensaje,
+        creado=trabajo.creado,
+        finalizado=trabajo.finalizado
+    )
+
+def _avance(importador: ImportadorEstudiantes) -> dict:
+    return {
+        'filas_procesadas': importador.procesados,
+        'estudiantes_creados': importador.creados,
+        'estudiantes_actualizados': importador.actualizados,
+        'estudiantes_sin_cambios': importador.sin_cambios,
+        'filas_fallidas': importador.fallidos,
+        'catalogos_creados': importador.catalogos_creados,
+        'errores': list(importador.errores),
+    }
+
+async def _actualizar(db: AsyncSession, trabajo_id: str, **valores):
+    await db.execute(
+        update(ImportacionTrabajoModel)
+        .where(ImportacionTrabajoModel.id == trabajo_id)
+        .values(**valores)
+    )
+
+async def _cancelacion_solicitada(db: AsyncSession, trabajo_id: str) -> bool:
+    result = await db.execute(
+        select(ImportacionTrabajoModel.cancelacion_solicitada)
+        .where(ImportacionTrabajoModel.id == trabajo_id)
+    )
+    return bool(result.scalar())
+
+def _obtener_cupos() -> asyncio.Semaphore:
+    # Se crea perezosamente para quedar ligado al event loop de la aplicación
+    global _cupos
+    if _cupos is None:
+        _cupos = asyncio.Semaphore(IMPORTACION_TRABAJOS_CONCURRENTES)
+    return _cupos
+
+async def _depurar_finalizados(db: AsyncSession):
+    # Conservar solo los IMPORTACION_TRABAJOS_RETENIDOS finalizados más recientes
+    retenidos = select(ImportacionTrabajoModel.id).where(
+        ImportacionTrabajoModel.finalizado.is_not(None)
+    ).order_by(
+        ImportacionTrabajoModel.finalizado.desc()
+    ).limit(IMPORTACION_TRABAJOS_RETENIDOS)
+    await db.execute(
+        delete(ImportacionTrabajoModel).where(
+            ImportacionTrabajoModel.finalizado.is_not(None),
+            ImportacionTrabajoModel.id.not_in(retenidos.scalar_subquery())
+        )
+    )
+
+async def _finalizar(trabajo_id: str, estado: str, mensaje: str, importador):
+    valores = {'estado': estado, 'mensaje': mensaje, 'finalizado': datetime.utcnow()}
+    if importador is not None:
+        valores.update(_avance(importador))
+    async with AsyncSessionLocal() as db:
+        await _actualizar(db, trabajo_id, **valores)
+        await _depurar_finalizados(db)
+        await db.commit()
+
+async def _ejecutar(
+    trabajo_id: str, usuario_id: int, formato: str, ruta: str,
+    omitir_invalidos: bool, usar_copy: bool, crear_catalogos: bool
+):
+    importador = None
+    estado, mensaje = EstadoTrabajo.FALLIDO.value, "Importación interrumpida"
+    try:
+        async with _obtener_cupos():
+            async with AsyncSessionLocal() as db:
+                if await _cancelacion_solicitada(db, trabajo_id):
+                    raise asyncio.CancelledError()
+                await _actualizar(db, trabajo_id, estado=EstadoTrabajo.EN_PROCESO.value)
+                await db.commit()
+                importador = ImportadorEstudiantes(
+                    db, usuario_id,
+                    omitir_invalidos=omitir_invalidos,
+                    usar_copy=usar_copy,
+                    crear_catalogos=crear_catalogos
+                )
+                try:
+                    with open(ruta, "rb") as archivo:
+                        bloques = leer_por_bloques(archivo, formato)
+                        try:
+                            while True:
+                                bloque = await leer_siguiente_bloque(bloques)
+                                if bloque is None:
+                                    break
+                                await importador.procesar(bloque)
+                                # El avance se confirma junto con el bloque
+                                await _actualizar(db, trabajo_id, **_avance(importador))
+                                await db.commit()
+                                if await _cancelacion_solicitada(db, trabajo_id):
+                                    raise asyncio.CancelledError()
+                        finally:
+                            bloques.close()
+                except BaseException:
+                    await db.rollback()
+                    raise
+        estado, mensaje = EstadoTrabajo.COMPLETADO.value, "Proceso completado exitosamente"
+    except asyncio.CancelledError:
+        estado = EstadoTrabajo.CANCELADO.value
+        mensaje = "Importación cancelada; los bloques ya confirmados se conservan"
+        raise
+    except ValueError as ve:
+        mensaje = f"Error al procesar el archivo: {str(ve)}"
+    except Exception as e:
+        mensaje = f"Error interno al procesar el archivo: {str(e)}"
+    finally:
+        os.remove(ruta)
+        _tareas.pop(trabajo_id, None)
+        await _finalizar(trabajo_id, estado, mensaje, importador)
+
+async def encolar_importacion(
+    db: AsyncSession,
+    upload_file,
+    formato: str,
+    usuario_id: int,
+    omitir_invalidos: bool = False,
+    usar_copy: bool = False,
+    crear_catalogos: bool = False
+) -> TrabajoImportacion:
+    """Copia la subida a un archivo temporal, registra el trabajo y lanza su
+    importación en segundo plano en este proceso.
+
+    La copia es necesaria porque el archivo temporal de la subida se cierra
+    al terminar la petición.
+    """
+    ruta = await ejecutar_en_hilo(guardar_temporal, upload_file.file, f".{formato}")
+    trabajo = ImportacionTrabajoModel(
+        id=uuid.uuid4().hex,
+        usuario_id=usuario_id,
+        archivo=upload_file.filename,
+        estado=EstadoTrabajo.PENDIENTE.value,
+        errores=[],
+        creado=datetime.utcnow()
+    )
+    try:
+        db.add(trabajo)
+        await db.commit()
+    except BaseException:
+        os.remove(ruta)
+        raise
+    await db.refresh(trabajo)
+    _tareas[trabajo.id] = asyncio.create_task(_ejecutar(
+        trabajo.id, usuario_id, formato, ruta, omitir_invalidos, usar_copy, crear_catalogos
+    ))
+    return _reporte(trabajo)
+
+async def _trabajo_del_usuario(
+    db: AsyncSession, trabajo_id: str, usuario_id: int
+) -> Optional[ImportacionTrabajoModel]:
+    trabajo = await db.get(ImportacionTrabajoModel, trabajo_id, populate_existing=True)
+    if trabajo is None or trabajo.usuario_id != usuario_id:
+        return None
+    return trabajo
+
+async def obtener_trabajo(db: AsyncSession, trabajo_id: str, usuario_id: int) -> Optional[TrabajoImportacion]:
+    trabajo = await _trabajo_del_usuario(db, trabajo_id, usuario_id)
+    return _reporte(trabajo) if trabajo else None
+
+async def listar_trabajos(db: AsyncSession, usuario_id: int):
+    result = await db.execute(
+        select(ImportacionTrabajoModel)
+        .where(ImportacionTrabajoModel.usuario_id == usuario_id)
+        .order_by(ImportacionTrabajoModel.creado)
+    )
+    return [_reporte(trabajo) for trabajo in result.scalars().all()]
+
+async def cancelar_trabajo(db: AsyncSession, trabajo_id: str, usuario_id: int) -> Optional[TrabajoImportacion]:
+    """Cancela un trabajo pendiente o en proceso.
+
+    Si se ejecuta en este proceso, espera a que se detenga; si no, registra
+    la solicitud y el worker que lo ejecuta lo detiene tras el bloque en curso.
+    """
+    trabajo = await _trabajo_del_usuario(db, trabajo_id, usuario_id)
+    if trabajo is None:
+        return None
+    if trabajo.finalizado is None:
+        await _actualizar(db, trabajo_id, cancelacion_solicitada=True)
+        await db.commit()
+        tarea = _tareas.get(trabajo_id)
+        if tarea is not None:
+            tarea.cancel()
+            await asyncio.gather(tarea, return_exceptions=True)
+        trabajo = await _trabajo_del_usuario(db, trabajo_id, usuario_id)
+    return _reporte(trabajo)
+
+async def cancelar_todos():
+    """Cancela los trabajos en curso en este proceso (al apagar la aplicación)."""
+    tareas = list(_tareas.values())
+    for tarea in tareas:
+        tarea.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
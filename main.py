@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from app.models import create_tables
+from app.config.database import AsyncSessionLocal
 from app.routers.UsuarioRoute import router as usuario_router
 from app.routers.EstudianteRoute import router as estudiante_router
 from app.routers.CatalogoRoute import router as catalogo_router
+from app.routers.MetricasRoute import router as metricas_router
 from app.auth.authRoutes import router as auth_router
+from app.core.ejecutores import EjecutorSaturado, cerrar_ejecutores
+from app.services.trabajosImportacionService import cancelar_todos
+from app.services.estadisticasService import (
+    reconstruir_resumen, recalcular_niveles_riesgo, resumen_vacio
+)
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -26,11 +34,38 @@ app.include_router(auth_router)  # Primero incluimos el router de autenticación
 app.include_router(usuario_router)
 app.include_router(estudiante_router)
 app.include_router(catalogo_router)
+app.include_router(metricas_router)
+
+# Un ejecutor con la cola llena responde 503 para que el cliente reintente
+@app.exception_handler(EjecutorSaturado)
+async def ejecutor_saturado_handler(request: Request, exc: EjecutorSaturado):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
 
 # Crear las tablas al iniciar la aplicación
 @app.on_event("startup")
 async def startup_event():
     await create_tables()
+    # Actualizar el nivel de riesgo guardado si cambiaron los umbrales. El
+    # resumen de estadísticas se mantiene con cada escritura: solo se
+    # reconstruye si está vacío (primer arranque) o si cambiaron niveles de
+    # riesgo; para corregirlo a mano, POST /metricas/resumen/reconstruir
+    async with AsyncSessionLocal() as db:
+        actualizadas = await recalcular_niveles_riesgo(db)
+        if actualizadas:
+            print(f"Nivel de riesgo recalculado en {actualizadas} métricas")
+        if actualizadas or await resumen_vacio(db):
+            await reconstruir_resumen(db)
+        await db.commit()
+
+# Detener las importaciones en segundo plano y los ejecutores al apagar la aplicación
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cancelar_todos()
+    cerrar_ejecutores()
 
 @app.get("/")
 def read_root():